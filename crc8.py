@@ -1,7 +1,4 @@
 #!python3
-from ctypes import *
-from ctypes import cdll
-from ctypes.wintypes import *
 
 
 # class crc8:
@@ -70,4 +67,12 @@ def ns_crc_buf(buf):
     crc = 0
     for j in buf:            
         crc = ns_crc_byte(j, crc)
-    return ns_crc_byte(0, crc)
\ No newline at end of file
+    return ns_crc_byte(0, crc)
+
+
+# update running crc with input buf data, used for incremental crc calc,
+# final crc value is ns_crc_byte(0, crc)
+def ns_crc_update(buf, crc=0):
+    for j in buf:
+        crc = ns_crc_byte(j, crc)
+    return crc
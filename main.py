@@ -1,33 +1,65 @@
 #!python3
 
+import os
 import sys
-import threading
-from queue import Queue
+import random
 from time import sleep
 from datetime import datetime
-from ctypes import c_int
-from PyQt5.QtWidgets import *
-from PyQt5 import QtCore, QtGui, uic
-from PyQt5.QtCore import QRect, QRectF, Qt, pyqtSlot
-from ns_commander import NS3_Commander
+from PyQt5.QtWidgets import (QApplication, QDesktopWidget, QGraphicsScene,
+        QMainWindow, QShortcut, QStyleFactory)
+from PyQt5 import QtCore, QtGui
+from PyQt5.QtCore import QRectF, Qt, pyqtSlot
+from ns_ui import ns_load_ui
+from ns_pool import NS_ConnectionPool
+from ns_logfile import NS_LogWriter
 from ns_anim import NS_Animate
 
 
 __version__ = 2.574
 
+
+# cancellable job for tests thread pool, ' func(job, *args) ' must check job.cancelled
+class NS_Job(QtCore.QRunnable):
+    def __init__(self, func, *args):
+        super(NS_Job, self).__init__()
+        self.setAutoDelete(False)
+        self.func = func
+        self.args = args
+        self.cancelled = False
+        self.started = False
+        self.done = False
+
+    def run(self):
+        self.started = True
+        try:
+            if not self.cancelled:
+                self.func(self, *self.args)
+        finally:
+            self.done = True
+
+    def cancel(self):
+        self.cancelled = True
+
 # main window class
 class ns_utility(QMainWindow):
 
     log_signal = QtCore.pyqtSignal(str, str)
     test_progress_signal = QtCore.pyqtSignal(int)
     device_ready_signal = QtCore.pyqtSignal(bool)
+    capture_signal = QtCore.pyqtSignal(object)
 
     # constructor
     def __init__(self):
         super().__init__()
 
-        # Create the queue for threads
-        self.nqueue = Queue()
+        # one thread pool for comunicate neilscope device, queued jobs run one by one
+        self.job_pool = QtCore.QThreadPool(self)
+        self.job_pool.setMaxThreadCount(1)
+        self.jobs = []
+        # queued and running device tests count
+        self.tests_queued = 0
+        # log messages waiting for render to text browser
+        self.log_pending = []
         # init user interface
         self.initUI()
 
@@ -37,17 +69,23 @@ class ns_utility(QMainWindow):
         self.test_progress_signal.connect(self.test_progress_slot)
         self.device_ready_signal.connect(self.device_ready_slot)
         self.log_signal.connect(self.qlog_message)
+        self.capture_signal.connect(self.waveView.set_data)
 
-        # neiscope device command 'driver' object
-        self.ns3 = NS3_Commander()
+        # log records appended to per-run file by background writer, direct from emitting thread
+        self.log_file = NS_LogWriter(log_dir='logs')
+        self.log_signal.connect(self.log_file.write, QtCore.Qt.DirectConnection)
 
-        # thread for comunicate neilscope device
-        t = threading.Thread(target=self.ns_test_worker)
-        t.daemon = True  # thread dies when main thread exits.
-        t.start()
+        # neiscope device command 'driver' object, created with first test run
+        self.ns3 = None
+        # captures archive and golden references, opened with first test run,
+        # references cached in memory for all next runs
+        self.archive = None
+        self.golden = None
+        # opened telnet sessions, reused by next test runs
+        self.ns_pool = NS_ConnectionPool(idle_timeout=120.0)
 
-        # start animation
-        self.anim.machine.start()
+        # 'Esc' - cancel running and queued tests
+        QShortcut(QtGui.QKeySequence('Esc'), self, self.cancel_jobs)
 
         # set window to center and show
         self.center()
@@ -65,25 +103,32 @@ class ns_utility(QMainWindow):
             'Ildar :: Muha',
             '---',
             'Special thanks to all who supported the project all the time !!!' ]
-        self.nqueue.put('start')
+        self.start_job(self.ns_intro_job)
 
     # initialization UI
     def initUI(self):
-        # load main ui window
-        self.uic = uic.loadUi('main.ui', self)
+        # load main ui window, from cached compiled module if 'NS_UI_CACHE' not '0'
+        self.uic = ns_load_ui('main.ui', self, cache=os.environ.get('NS_UI_CACHE', '1') != '0')
 
         gr_rect = QRectF(0, 0, self.rect().width(), 20)
         self.scene = QGraphicsScene(gr_rect)
         self.scene.setBackgroundBrush(Qt.black)
 
+        # status animation, paused until device test started
         self.anim = NS_Animate(self.scene,
                                gr_rect.width(), gr_rect.height(),
                                QtGui.QColor.fromRgb(0, 32, 49))
 
         self.horizontalLayout_anim.addWidget(self.anim.window)
 
-        # self.anim.start()
-        self.anim.window.resize(gr_rect.width(), gr_rect.height())
+        # log rendered by timer in batches, max lines count limited
+        self.textBrowser.document().setMaximumBlockCount(5000)
+        self.log_timer = QtCore.QTimer(self)
+        self.log_timer.setSingleShot(True)
+        self.log_timer.setInterval(50)
+        self.log_timer.timeout.connect(self.log_flush)
+
+        self.anim.window.resize(int(gr_rect.width()), int(gr_rect.height()))
 
     # set window to center func
     def center(self):
@@ -96,138 +141,112 @@ class ns_utility(QMainWindow):
     def log(self, msg, lvl='ginf'):
         self.log_signal.emit('\'GL\' ' + msg, lvl)
 
-    # device test sequence
-    def ns_test_seq(self):
-        # neilscope device test sequence program, [ command function, [func args], delay sec after, log mesaage ]
-        ns_test_sequence = [
-            {'cmd': self.ns3.mode, 'data': 'la', 'delay': 0, 'msg': 'set mode \'LA\'...'},
-            {'cmd': self.ns3.send_sw_ver, 'data': [1.1, 0x02], 'delay': 0.5, 'msg': 'send sw ver...'},
-            {'cmd': self.ns3.mode, 'data': 'osc', 'delay': 0, 'msg': 'set mode \'OSC\'...'},
-            {'cmd': self.ns3.send_sw_ver, 'data': [1.1, 0x02], 'delay': 0.5, 'msg': 'send sw ver...'},
-            {'cmd': self.ns3.ach_state, 'data': ['AB', 'dc'], 'delay': 0, 'msg': 'set ch A/B DC input...'},
-            {'cmd': self.ns3.ach_div, 'data': ['AB', '50V'], 'delay': 0.05, 'msg': 'set ch A/B 50V/div...'},
-            {'cmd': self.ns3.ach_div, 'data': ['AB', '50mV'], 'delay': 0.05, 'msg': 'set ch A/B 50mV/div...'},
-            {'cmd': self.ns3.sync_mode, 'data': ['off'], 'delay': 0, 'msg': 'set sync off state...'},
-            {'cmd': self.ns3.sync_sourse, 'data': ['A'], 'delay': 0, 'msg': 'set sync sourse to ch A...'},
-            {'cmd': self.ns3.sync_type, 'data': ['rise'], 'delay': 0, 'msg': 'set sync type \'rise\'...'},
-            {'cmd': self.ns3.sweep_div, 'data': ['1uS'], 'delay': 0, 'msg': 'set sweep 1uS/div...'},
-            {'cmd': self.ns3.sweep_mode, 'data': ['standart'], 'delay': 0, 'msg': 'set swep mode \'standart\'...'},
-            {'cmd': self.ns3.get_data, 'data': ['A', 100, []], 'delay': 0, 'msg': 'get ch A 100 bytes data...'},
-            {'cmd': self.ns3.get_data, 'data': ['B', 100, []], 'delay': 0, 'msg': 'get ch B 100 bytes data...'},
-        ]
-
-        progr_one_step = 100 / len(ns_test_sequence)
-        progr = 0
-
-        self.log('start test sequence')
-        for cn in ns_test_sequence:
-            self.log(cn['msg'])
-            # send sequense command
-            cmd_result = cn['cmd']( cn['data'] )
-            # result
-            if not cmd_result:
-                self.log('SUCCESS\r\n')
-                sleep(cn['delay'])
-                progr = progr + progr_one_step
-                self.test_progress_signal.emit(progr)   # emit progress signal
-            else:
-                self.log('FAILED\r\n', 'err')
-                return False
-        return True
-
-    # device main test
-    def ns_test_main(self):
+    # device main test, 'settings' - GUI state captured when test queued
+    def ns_test_main(self, job, settings):
+        # commander, transports and test runner imported on first test,
+        # not at startup
+        from ns_test import NS_TestRunner
+        if self.ns3 is None:
+            from ns_commander import NS3_Commander
+            from ns_archive import NS_CaptureArchive
+            from ns_golden import NS_GoldenLibrary
+            self.ns3 = NS3_Commander()
+            self.archive = NS_CaptureArchive('captures')
+            self.golden = NS_GoldenLibrary('golden')
+
         lg = self.log
-        test_seq_flag = True
-        self.test_progress_signal.emit(0)   # complite progress = 0%
 
         # set interface
-        index = self.combobox_Interface.currentIndex()
+        index = settings['interface']
 
-        if self.chckbx_interface.checkState():
+        if settings['interface_log']:
             interface_log = self.log_signal.emit
         else:
             interface_log = None
 
         if index == 0:
-            self.log(str(self.chckbx_interface.checkState()))
             self.ns3.set_interface( interface = 'usbxpress', log = interface_log )
 
         elif index == 1:
-            ip, port = self.lineEdit_IP_Port.text().split(':')
-            self.ns3.set_interface( interface = 'telnet', ip = ip, port = int(port), log = interface_log )
+            ip, port = settings['endpoint'].split(':')
+            self.ns3.set_interface( interface = 'telnet', ip = ip, port = int(port), log = interface_log, pool = self.ns_pool, reader = True )
 
-        if self.nslog_chckbx.checkState():
+        if settings['ns_log']:
             self.ns3.set_log(self.log_signal.emit)
         else:
             self.ns3.set_log(None)
 
-        lg('connect to device...')
-        if not self.ns3.connect():
-            lg('successful connected to device, fw ver: %3.1F' %
-               self.ns3.mcu_firm_ver)
-
-            lg('get batt charge...')
-            battv = [int(0)]
-            if self.ns3.get_batt(battv):
-                return False
-            lg('batt charge: %d%s' % (battv[0], '%'))
-
-            # start test sequence
-            test_seq_flag = self.ns_test_seq()
-
-            lg('disconnect from device...')
-            if not self.ns3.disconnect():
-                lg('disconnect success')
-            else:
-                test_seq_flag = False
-                lg('FAILED', 'err')
-        else:
-            test_seq_flag = False
-            lg('FAILED', 'err')
-
-        # complite progress = 100%
-        self.test_progress_signal.emit(100)
-
-        lg('\r\n///{0}///{0}///'.format('-' * 20), 'end')
-        if test_seq_flag:
-            lg('TEST SUCCESSFUL DONE', 'end')
-        else:
-            lg('TEST FAILED', 'err')
-
-    # The worker thread pulls an item from the queue and processes it
-    def ns_test_worker(self):
-        while True:
-            item = self.nqueue.get()
-            with threading.Lock():
-                if item == 'start':
-                    import random
-                    for m in self.start_msg:
-                        self.log_signal.emit(m, '')
-                        sleep(random.uniform(0.15, 0.3))
-                if item == 'test':
-                    self.ns_test_main()
-                    sleep(0.5)
-                    self.device_ready_signal.emit(True)
-                    self.startButton.setEnabled(True)
-
-            self.nqueue.task_done()
-
-    # START button click slot
+        # connect, test sequence, disconnect
+        runner = NS_TestRunner(self.ns3, log=lg, progress=self.test_progress_signal.emit,
+                               cancel=lambda: job.cancelled, archive=self.archive,
+                               golden=self.golden)
+        runner.run()
+
+        # show captured ch A data
+        if 'A' in runner.captures:
+            self.capture_signal.emit(runner.captures['A'])
+
+    # intro messages job
+    def ns_intro_job(self, job):
+        for m in self.start_msg:
+            if job.cancelled:
+                return
+            self.log_signal.emit(m, '')
+            sleep(random.uniform(0.15, 0.3))
+
+    # device test job, run log file written from job thread so no records lost
+    def ns_test_job(self, job, settings):
+        self.device_ready_signal.emit(False)
+        self.log_file.start_run()
+        try:
+            self.ns_test_main(job, settings)
+        finally:
+            self.log_file.end_run()
+            self.device_ready_signal.emit(True)
+
+    # queue job to device thread pool
+    def start_job(self, func, *args):
+        self.jobs = [j for j in self.jobs if not j.done and not j.cancelled]
+        job = NS_Job(func, *args)
+        self.jobs.append(job)
+        self.job_pool.start(job)
+        return job
+
+    # cancel running job and remove queued
+    def cancel_jobs(self):
+        self.job_pool.clear()
+        running = 0
+        for job in self.jobs:
+            job.cancel()
+            if job.started and not job.done and job.func == self.ns_test_job:
+                running += 1
+        # removed queued jobs never report complite
+        self.tests_queued = running
+        self.update_start_button()
+        if not running:
+            self.anim.pause()
+        self.log('tests cancelled', 'warn')
+
+    # START button click slot, test queued and window not blocked,
+    # several clicks queue several device tests
     @pyqtSlot()
     def StartButtonClicked(self):
-        if not self.startButton.isEnabled():
-            return
-        self.device_ready_signal.emit(False)
-        self.startButton.setEnabled(False)
-
-        self.nqueue.join()         # block until all tasks are done
-
-        self.textBrowser.clear()
-        self.chckbx_interface.toggled.emit(self.chckbx_interface.isChecked())
-        self.nslog_chckbx.toggled.emit(self.nslog_chckbx.isChecked())
-
-        self.nqueue.put('test')    # start ns test thread
+        settings = {
+            'interface': self.combobox_Interface.currentIndex(),
+            'endpoint': self.lineEdit_IP_Port.text(),
+            'interface_log': bool(self.chckbx_interface.checkState()),
+            'ns_log': bool(self.nslog_chckbx.checkState()),
+        }
+        self.start_job(self.ns_test_job, settings)
+        self.tests_queued += 1
+        self.update_start_button()
+
+    # show queued tests count on START button
+    def update_start_button(self):
+        if self.tests_queued > 1:
+            self.startButton.setText('START (%d)' % self.tests_queued)
+        else:
+            self.startButton.setText('START')
 
     # device test sequence progress signal/slot
     old_progr = 0
@@ -239,45 +258,88 @@ class ns_utility(QMainWindow):
         elif not progress:
             self.old_progr = progress
 
-    # device test sequence successfull complite signal/slot
+    # device test start (False) and complite (True) signal/slot
     @pyqtSlot(bool)
     def device_ready_slot(self, dev_rdy):
-        self.anim.timer.setInterval(1000)
-        # save log to file
-        f = open('logg.txt', 'wt')
-        f.write(self.textBrowser.toPlainText())
-        f.close()
+        if not dev_rdy:
+            self.log_pending = []
+            self.textBrowser.clear()
+            self.anim.resume()
+            return
 
-    # QtSlot for log masagges
+        self.anim.timer.setInterval(1000)
+        self.log_flush()
+        self.tests_queued = max(0, self.tests_queued - 1)
+        self.update_start_button()
+
+        # animation frame budget statistic for this run
+        frames, over, mean, fmax = self.anim.window.stats()
+        if over:
+            self.log('animation frames over budget: %d of %d, mean %.2f ms, max %.2f ms' %
+                     (over, frames, mean * 1000, fmax * 1000), 'warn')
+
+        # no more queued tests - animation stop until next test
+        if not self.tests_queued:
+            self.anim.pause()
+
+    # log level colors
+    log_colors = {
+        'err': (255, 64, 64),
+        'warn': (220, 220, 140),
+        'ginf': (255, 255, 255),
+        'end': (170, 255, 0),
+        'inf': (119, 255, 176),
+        '': (212, 224, 212),
+    }
+
+    # QtSlot for log masagges, message buffered and rendered by log timer
     @pyqtSlot(str, str)
     def qlog_message(self, msg, lvl=''):
-        txbr = self.textBrowser
-        qqolor = QtGui.QColor.fromRgb
-
-        if lvl == 'err':
-            txbr.setTextColor(qqolor(255, 64, 64))
-        elif lvl == 'warn':
-            txbr.setTextColor(qqolor(220, 220, 140))
-        elif lvl == 'ginf':
-            txbr.setTextColor(qqolor(255, 255, 255))
-        elif lvl == 'end':
-            txbr.setTextColor(qqolor(170, 255, 0))
-        elif lvl == 'inf':
-            txbr.setTextColor(qqolor(119, 255, 176))
-        else:
-            txbr.setTextColor(qqolor(212, 224, 212))
+        self.log_pending.append(
+            (lvl, '%s: %s ' % (str(datetime.utcnow()).split()[1], msg.rstrip('\r\n'))))
+        if not self.log_timer.isActive():
+            self.log_timer.start()
+
+    # render all buffered log messages as one edit block
+    def log_flush(self):
+        pending = self.log_pending
+        if not pending:
+            return
+        self.log_pending = []
 
-        txbr.insertPlainText(
-            '%s: %s \r\n' % (str(datetime.utcnow()).split()[1], msg))
+        txbr = self.textBrowser
+        cursor = QtGui.QTextCursor(txbr.document())
+        cursor.movePosition(QtGui.QTextCursor.End)
+        cursor.beginEditBlock()
+
+        fmt = QtGui.QTextCharFormat()
+        for lvl, text in pending:
+            color = self.log_colors.get(lvl, self.log_colors[''])
+            fmt.setForeground(QtGui.QColor.fromRgb(*color))
+            if not txbr.document().isEmpty():
+                cursor.insertBlock()
+            cursor.insertText(text, fmt)
+
+        cursor.endEditBlock()
         sb = txbr.verticalScrollBar()
         sb.setValue(sb.maximum())
-        txbr.repaint()
 
     # EXIT button click
     @pyqtSlot()
     def CloseButtonClicked(self):
         self.close()
 
+    # window closed by EXIT button or window title X - stop tests, close pooled
+    # sessions, archive and log file
+    def closeEvent(self, event):
+        self.cancel_jobs()
+        self.job_pool.waitForDone(3000)
+        self.ns_pool.clear()
+        if self.archive is not None:
+            self.archive.close()
+        self.log_file.close()
+        event.accept()
+
 
 # program start here
 if __name__ == '__main__':
@@ -1,12 +1,13 @@
 #!python3
 import sys
+from time import perf_counter
 from PyQt5 import QtGui
 from PyQt5.QtCore import (QAbstractTransition, QEasingCurve, QEvent,
         QParallelAnimationGroup, QPropertyAnimation, qrand, QRect,
         QSequentialAnimationGroup, qsrand, QState, QStateMachine, Qt, QTime,
         QTimer)
-from PyQt5.QtWidgets import (QApplication, QGraphicsScene, QGraphicsView,
-        QGraphicsWidget)
+from PyQt5.QtWidgets import (QApplication, QGraphicsItem, QGraphicsScene,
+        QGraphicsView, QGraphicsWidget)
 
 
 #
@@ -30,6 +31,52 @@ class QGraphicsRectWidget(QGraphicsWidget):
     def paint(self, painter, option, widget):
         painter.fillRect(self.rect(), self.color)
 
+
+# animation view, opaque non-antialiased viewport with cached background,
+# each frame paint time measured against frame budget
+class NS_AnimView(QGraphicsView):
+    def __init__(self, scene, frame_budget=0.004):
+        super(NS_AnimView, self).__init__(scene)
+
+        self.setFrameStyle(0)
+        self.setAlignment(Qt.AlignLeft | Qt.AlignTop)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+
+        self.setRenderHint(QtGui.QPainter.Antialiasing, False)
+        self.setCacheMode(QGraphicsView.CacheBackground)
+        self.setViewportUpdateMode(QGraphicsView.SmartViewportUpdate)
+        self.setOptimizationFlags(QGraphicsView.DontSavePainterState |
+                                  QGraphicsView.DontAdjustForAntialiasing)
+        self.viewport().setAttribute(Qt.WA_OpaquePaintEvent)
+        self.viewport().setAttribute(Qt.WA_NoSystemBackground)
+
+        # max paint time of one frame, sec
+        self.frame_budget = frame_budget
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.frames = 0
+        self.frames_over = 0
+        self.frame_time = 0.0
+        self.frame_max = 0.0
+
+    # frames count, over budget frames count, mean and max frame paint time in sec
+    def stats(self):
+        mean = self.frame_time / self.frames if self.frames else 0.0
+        return self.frames, self.frames_over, mean, self.frame_max
+
+    def paintEvent(self, event):
+        start = perf_counter()
+        super(NS_AnimView, self).paintEvent(event)
+        t = perf_counter() - start
+
+        self.frames += 1
+        self.frame_time += t
+        self.frame_max = max(self.frame_max, t)
+        if t > self.frame_budget:
+            self.frames_over += 1
+
 #
 class StateSwitchTransition(QAbstractTransition):
     def __init__(self, rand):
@@ -70,9 +117,12 @@ class StateSwitcher(QState):
         trans.addAnimation(animation)
 
 
-#
+# status animation, runs only between resume() and pause(),
+# no timers and no repaints while paused
 class NS_Animate(object):
     def __init__(self, scene, x_max, y_max, back_color):
+        x_max = int(x_max)
+        y_max = int(y_max)
 
         scene = QGraphicsScene(0, 0, x_max, y_max)
         scene.setBackgroundBrush(back_color)
@@ -80,13 +130,11 @@ class NS_Animate(object):
         color = [Qt.green, Qt.lightGray, Qt.darkYellow, QtGui.QColor.fromRgb(255, 85, 0)]
         self.anim_butt = [ QGraphicsRectWidget(color[j]) for j in range(4) ]
         for j in range(4):
+            self.anim_butt[j].setCacheMode(QGraphicsItem.DeviceCoordinateCache)
             scene.addItem(self.anim_butt[j])
 
-        self.window = QGraphicsView(scene)
-        self.window.setFrameStyle(0)
-        self.window.setAlignment(Qt.AlignLeft | Qt.AlignTop)
-        self.window.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        self.window.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.window = NS_AnimView(scene)
+        self.running = False
 
         self.machine = QStateMachine()
 
@@ -94,10 +142,10 @@ class NS_Animate(object):
         self.timer = QTimer()
         self.timer.setInterval(1250)
         self.timer.setSingleShot(True)
-        self.group.entered.connect(self.timer.start)
+        self.group.entered.connect(self.next_state)
 
         # set states positions
-        anim_state_rects = [ [QRect(x_max*xp/6, y_max*yp/4, 8, 8) for xp in range(4)] for yp in range(4) ]
+        anim_state_rects = [ [QRect(x_max*xp//6, y_max*yp//4, 8, 8) for xp in range(4)] for yp in range(4) ]
         self.states = [ self.createGeometryState(
                                 self.anim_butt[0], anim_state_rects[0][j], self.anim_butt[1], anim_state_rects[1][j],
                                 self.anim_butt[2], anim_state_rects[2][j], self.anim_butt[3], anim_state_rects[3][j],
@@ -108,28 +156,28 @@ class NS_Animate(object):
 
 
         self.animationGroup = QParallelAnimationGroup()
-        self.anim = QPropertyAnimation(self.anim_butt[3], 'geometry')
+        self.anim = QPropertyAnimation(self.anim_butt[3], b'geometry')
         self.anim.setDuration(1250)
         self.anim.setEasingCurve(QEasingCurve.InBack)
         self.animationGroup.addAnimation(self.anim)
 
         self.subGroup = QSequentialAnimationGroup(self.animationGroup)
         self.subGroup.addPause(100)
-        self.anim = QPropertyAnimation(self.anim_butt[2], 'geometry')
+        self.anim = QPropertyAnimation(self.anim_butt[2], b'geometry')
         self.anim.setDuration(1000)
         self.anim.setEasingCurve(QEasingCurve.OutElastic)
         self.subGroup.addAnimation(self.anim)
 
         self.subGroup = QSequentialAnimationGroup(self.animationGroup)
         self.subGroup.addPause(500)
-        self.anim = QPropertyAnimation(self.anim_butt[1], 'geometry')
+        self.anim = QPropertyAnimation(self.anim_butt[1], b'geometry')
         self.anim.setDuration(500)
         self.anim.setEasingCurve(QEasingCurve.OutElastic)
         self.subGroup.addAnimation(self.anim)
 
         self.subGroup = QSequentialAnimationGroup(self.animationGroup)
         self.subGroup.addPause(750)
-        self.anim = QPropertyAnimation(self.anim_butt[0], 'geometry')
+        self.anim = QPropertyAnimation(self.anim_butt[0], b'geometry')
         self.anim.setDuration(250)
         self.anim.setEasingCurve(QEasingCurve.OutElastic)
         self.subGroup.addAnimation(self.anim)
@@ -143,6 +191,24 @@ class NS_Animate(object):
         self.machine.setInitialState(self.group)
         self.machine.start()
 
+    # start animation, frame stats reset
+    def resume(self):
+        if self.running:
+            return
+        self.running = True
+        self.window.reset_stats()
+        self.timer.start()
+
+    # stop animation after current move finished
+    def pause(self):
+        self.running = False
+        self.timer.stop()
+
+    # next state switch only while running
+    def next_state(self):
+        if self.running:
+            self.timer.start()
+
     #
     def createGeometryState(self, w1, rect1, w2, rect2, w3, rect3, w4, rect4, parent):
         result = QState(parent)
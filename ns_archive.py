@@ -0,0 +1,182 @@
+#!python3
+
+import os
+import sys
+import mmap
+import glob
+import struct
+import threading
+import numpy as np
+from time import time, perf_counter
+
+
+# capture record header in data file, data file readable without index:
+# magic, device, run, step, channel, sweep div, adiv, sweep mode, timestamp, samples bytes
+ns_rec_header = struct.Struct('<4s16sIHBBBBdI')
+ns_rec_magic = b'NSC1'
+
+# index file record, same fields + data file chunk number and samples offset
+ns_index_dtype = np.dtype([
+    ('device', 'S16'), ('run', '<u4'), ('step', '<u2'),
+    ('channel', 'u1'), ('sweep_div', 'u1'), ('adiv', 'u1'), ('sweep_mode', 'u1'),
+    ('time', '<f8'), ('chunk', '<u2'), ('offset', '<u8'), ('nbytes', '<u4'),
+])
+
+# not known setting code
+ns_code_none = 0xFF
+
+
+# append-only archive of captures, data in chunk files 'captures.NNNN.dat'
+# rolled by size, index 'captures.idx' of fixed records for fast lookup,
+# samples read as numpy views of memory-mapped chunk files without copy
+class NS_CaptureArchive(object):
+    """ capture archive """
+
+    def __init__(self, path, **kwargs):
+        """ constructor """
+        self.path = path
+        self.chunk_bytes = kwargs.get('chunk_bytes', 1 << 30)
+        os.makedirs(path, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.index_path = os.path.join(path, 'captures.idx')
+        self.data = None
+        self.chunk = 0
+        self.maps = {}
+        self._index = None
+
+        chunks = sorted(glob.glob(os.path.join(path, 'captures.*.dat')))
+        if chunks:
+            self.chunk = int(chunks[-1].split('.')[-2])
+
+    def chunk_path(self, chunk):
+        return os.path.join(self.path, 'captures.%04d.dat' % chunk)
+
+    # append capture samples, settings are codes from ns_commander tables,
+    # return index record number
+    def append(self, samples, **kwargs):
+        samples = memoryview(samples).cast('B')
+        t = kwargs.get('timestamp', None) or time()
+        device = kwargs.get('device', '').encode('utf-8')[:16]
+        fields = (kwargs.get('run', 0), kwargs.get('step', 0), kwargs.get('channel', ns_code_none),
+                  kwargs.get('sweep_div', ns_code_none), kwargs.get('adiv', ns_code_none),
+                  kwargs.get('sweep_mode', ns_code_none))
+
+        with self.lock:
+            if self.data is None:
+                self.data = open(self.chunk_path(self.chunk), 'ab')
+            if self.data.tell() and self.data.tell() + ns_rec_header.size + len(samples) > self.chunk_bytes:
+                self.data.close()
+                self.chunk += 1
+                self.data = open(self.chunk_path(self.chunk), 'ab')
+
+            offset = self.data.tell() + ns_rec_header.size
+            self.data.write(ns_rec_header.pack(ns_rec_magic, device, *(fields + (t, len(samples)))))
+            self.data.write(samples)
+            self.data.flush()
+
+            rec = np.array([(device,) + fields + (t, self.chunk, offset, len(samples))], dtype=ns_index_dtype)
+            with open(self.index_path, 'ab') as f:
+                f.write(rec.tobytes())
+                pos = f.tell() // ns_index_dtype.itemsize - 1
+        return pos
+
+    # index records as memory-mapped structured array, updated if index grown
+    def index(self):
+        size = os.path.getsize(self.index_path) if os.path.exists(self.index_path) else 0
+        count = size // ns_index_dtype.itemsize
+        if not count:
+            return np.empty(0, ns_index_dtype)
+        if self._index is None or len(self._index) != count:
+            self._index = np.memmap(self.index_path, dtype=ns_index_dtype, mode='r', shape=(count,))
+        return self._index
+
+    # index record numbers of captures matched all provided fields
+    def find(self, device=None, run=None, step=None, channel=None):
+        idx = self.index()
+        mask = np.ones(len(idx), dtype=bool)
+        if device is not None:
+            mask &= idx['device'] == device.encode('utf-8')[:16]
+        if run is not None:
+            mask &= idx['run'] == run
+        if step is not None:
+            mask &= idx['step'] == step
+        if channel is not None:
+            mask &= idx['channel'] == channel
+        return np.nonzero(mask)[0]
+
+    # next free run number
+    def new_run(self):
+        idx = self.index()
+        return int(idx['run'].max()) + 1 if len(idx) else 1
+
+    # capture samples of index record as uint8 view of mapped chunk file
+    def read(self, n):
+        rec = self.index()[n]
+        chunk, offset, nbytes = int(rec['chunk']), int(rec['offset']), int(rec['nbytes'])
+
+        mm = self.maps.get(chunk, None)
+        if mm is None or len(mm) < offset + nbytes:
+            with self.lock:
+                if self.data is not None:
+                    self.data.flush()
+            with open(self.chunk_path(chunk), 'rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.maps[chunk] = mm
+        return np.frombuffer(mm, dtype=np.uint8, count=nbytes, offset=offset)
+
+    # rebuild index from data chunk files headers, for example after index lost
+    def rebuild_index(self):
+        recs = []
+        for chunk in sorted(int(p.split('.')[-2]) for p in glob.glob(os.path.join(self.path, 'captures.*.dat'))):
+            with open(self.chunk_path(chunk), 'rb') as f:
+                pos = 0
+                while True:
+                    hdr = f.read(ns_rec_header.size)
+                    if len(hdr) < ns_rec_header.size:
+                        break
+                    magic, device, *fields, t, nbytes = ns_rec_header.unpack(hdr)
+                    if magic != ns_rec_magic:
+                        break
+                    pos += ns_rec_header.size
+                    recs.append((device.rstrip(b'\0'),) + tuple(fields) + (t, chunk, pos, nbytes))
+                    pos += nbytes
+                    f.seek(pos)
+
+        self._index = None
+        np.array(recs, dtype=ns_index_dtype).tofile(self.index_path)
+        return len(recs)
+
+    def close(self):
+        with self.lock:
+            if self.data is not None:
+                self.data.close()
+                self.data = None
+        self._index = None
+        self.maps = {}
+
+
+if __name__ == '__main__':
+
+    # benchmark, usage: python ns_archive.py path [captures] [samples]
+    path = sys.argv[1] if len(sys.argv) > 1 else 'captures_bench'
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    length = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+
+    arch = NS_CaptureArchive(path)
+    samples = np.random.randint(0, 256, length).astype(np.uint8)
+    run = arch.new_run()
+
+    t = perf_counter()
+    for j in range(n):
+        arch.append(samples, device='bench', run=run, step=j % 14, channel=j & 1)
+    print('append %d x %d bytes: %.2f ms' % (n, length, (perf_counter() - t) * 1000))
+
+    t = perf_counter()
+    found = arch.find(device='bench', run=run, step=12, channel=0)
+    print('find: %d records of %d, %.3f ms' % (len(found), len(arch.index()), (perf_counter() - t) * 1000))
+
+    t = perf_counter()
+    total = sum(int(arch.read(j).max()) for j in found)
+    print('read and scan found: %.2f ms' % ((perf_counter() - t) * 1000))
+    arch.close()
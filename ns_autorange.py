@@ -0,0 +1,145 @@
+#!python3
+
+import sys
+import numpy as np
+from time import perf_counter
+
+
+# channel dividers from most sensitive, (name, volts per div)
+ns_ranges = [
+    ('10mV', 0.01), ('20mV', 0.02), ('50mV', 0.05), ('100mV', 0.1), ('200mV', 0.2), ('500mV', 0.5),
+    ('1V', 1.0), ('2V', 2.0), ('5V', 5.0), ('10V', 10.0), ('20V', 20.0), ('50V', 50.0),
+]
+
+
+# host-side auto range of analog channel: most sensitive divider without clipping
+# and with headroom, signal amplitude measured on any not clipped range predict
+# best range directly, clipped probes step up to not clipped range and narrow
+# range by binary search,
+# last chosen range of channel is first probe of next search
+class NS_AutoRange(object):
+    """ channel auto range """
+
+    def __init__(self, ns3, **kwargs):
+        """ constructor """
+        self.ns3 = ns3
+        # samples of one probe capture
+        self.probe_num = kwargs.get('probe_num', 64)
+        # max used part of half ADC scale
+        self.headroom = kwargs.get('headroom', 0.8)
+        # samples closer than margin to ADC limits are clipped
+        self.clip_margin = kwargs.get('clip_margin', 2)
+        self.zero = kwargs.get('zero', 128)
+        # ADC noise in codes, not counted in signal amplitude
+        self.noise = kwargs.get('noise', 2)
+        self.max_probes = kwargs.get('max_probes', 8)
+
+        self.volts = np.array([v for n, v in ns_ranges])
+        # last chosen range index by channel
+        self.cache = {}
+        self.probes = 0
+
+    # set channel range and capture probe, return (status, clipped, max deviation from zero in codes)
+    def probe(self, ch, r):
+        self.probes += 1
+        rd = []
+        if self.ns3.ach_div([ch, ns_ranges[r][0]]) or self.ns3.get_data([ch, self.probe_num, rd]):
+            return 1, False, 0
+
+        from ns_commander import ns_data_samples
+        y = np.frombuffer(ns_data_samples(rd[0], self.probe_num), dtype=np.uint8)
+        lo = int(y.min())
+        hi = int(y.max())
+        clipped = lo <= self.clip_margin or hi >= 255 - self.clip_margin
+        return 0, clipped, max(hi - self.zero, self.zero - lo)
+
+    # most sensitive range index from 'lo' where deviation 'm' measured on range 'r' fit headroom
+    def predict(self, m, r, lo):
+        target = self.headroom * min(self.zero, 255 - self.zero)
+        m = max(m - self.noise, 1)
+        fit = m * self.volts[r] / self.volts[lo:] <= target
+        if not fit.any():
+            return len(ns_ranges) - 1
+        return lo + int(np.argmax(fit))
+
+    # find and set best range of channel 'A' or 'B', return (status, range name),
+    # range name None if search failed
+    def search(self, ch):
+        self.probes = 0
+        lo, hi = 0, len(ns_ranges) - 1
+        best = None
+        r = self.cache.get(ch, hi)
+        step = 1
+        # range set on device by last probe
+        cur = None
+
+        while self.probes < self.max_probes:
+            cur = r
+            st, clipped, m = self.probe(ch, r)
+            if st:
+                return 1, None
+
+            if not clipped:
+                hi = r
+                k = self.predict(m, r, lo)
+                # less sensitive range not clipped too, set without probe
+                best = max(k, r)
+                if k >= r:
+                    break
+                r = k
+                continue
+
+            lo = r + 1
+            if lo > hi:
+                break
+            if best is None:
+                # clipped and no good range yet - step up from clipped range with doubled steps
+                r = min(hi, r + step)
+                step *= 2
+            else:
+                # clipped between known clipped and known good - binary search
+                r = (lo + hi) // 2
+                if r == best:
+                    break
+
+        if best is None:
+            best = len(ns_ranges) - 1
+        if best != cur and self.ns3.ach_div([ch, ns_ranges[best][0]]):
+            return 1, None
+
+        self.cache[ch] = best
+        return 0, ns_ranges[best][0]
+
+
+if __name__ == '__main__':
+
+    # simulation, usage: python ns_autorange.py [signal amplitude volts ...]
+    class SimScope(object):
+        def __init__(self, amp):
+            self.amp = amp
+            self.div = 11
+            self.captures = 0
+
+        def ach_div(self, param):
+            self.div = [n for n, v in ns_ranges].index(param[1])
+            return 0
+
+        def get_data(self, param):
+            self.captures += 1
+            # 8 div full scale, 32 codes per div
+            t = np.arange(param[1] + 9)
+            y = 128 + self.amp / ns_ranges[self.div][1] * 32 * np.sin(t / 5.0) + np.random.normal(0, 0.7, len(t))
+            param[2].append(list(np.clip(y, 0, 255).astype(np.uint8)))
+            return 0
+
+    amps = [float(a) for a in sys.argv[1:]] or [0.005, 0.03, 0.3, 2.5, 12.0, 140.0]
+    for amp in amps:
+        sim = SimScope(amp)
+        ar = NS_AutoRange(sim)
+        start = perf_counter()
+        st, name = ar.search('A')
+        first = ar.probes
+        sim.amp *= 1.3
+        st, name2 = ar.search('A')
+        print('amplitude %7.3f V: %-6s in %d probes, +30%%: %-6s in %d probes, %.2f ms' %
+              (amp, name, first, name2, ar.probes, (perf_counter() - start) * 1000))
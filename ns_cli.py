@@ -0,0 +1,113 @@
+#!python3
+
+# headless device test, runs same test as GUI without Qt and prints JSON result
+#
+# usage: python ns_cli.py --interface telnet --endpoint 192.168.1.119:2323
+#        python ns_cli.py --interface usbxpress [--serial NS3-0001]
+#
+# exit codes: 0 - test passed, 1 - test failed, 2 - device connect failed, 3 - bad arguments
+
+import sys
+import json
+import argparse
+from time import perf_counter
+
+start_time = perf_counter()
+
+from ns_commander import NS3_Commander
+from ns_test import NS_TestRunner
+
+
+EXIT_PASSED = 0
+EXIT_FAILED = 1
+EXIT_CONNECT = 2
+EXIT_ARGS = 3
+
+
+def stderr_log(msg, lvl=''):
+    sys.stderr.write('%s: %s\n' % (lvl or '-', msg.strip('\r\n')))
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='NeilScope 3 headless device test')
+    parser.add_argument('--interface', default='usbxpress', choices=['usbxpress', 'telnet'])
+    parser.add_argument('--endpoint', default='192.168.1.119:2323', help='telnet ip:port')
+    parser.add_argument('--serial', default=None, help='usbxpress device serial')
+    parser.add_argument('--dev-num', type=int, default=None, help='usbxpress device index')
+    parser.add_argument('--fake', action='store_true', help='use fake USBXpress dll, for dry run')
+    parser.add_argument('--out', default=None, help='write JSON result to file')
+    parser.add_argument('--archive', default=None, help='save captures to archive folder')
+    parser.add_argument('--lazy-flush', action='store_true',
+                        help='skip interface rx flush before command while responds in sync')
+    parser.add_argument('--golden', default=None, help='compare captures to references folder')
+    parser.add_argument('--save-golden', action='store_true', help='save captures as references')
+    parser.add_argument('-v', '--verbose', action='count', default=0,
+                        help='log to stderr, -vv with commander and interface log')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    try:
+        args = parse_args(argv)
+    except SystemExit as ex:
+        return EXIT_PASSED if ex.code == 0 else EXIT_ARGS
+
+    kwargs = { 'interface': args.interface, 'lazy_flush': args.lazy_flush }
+    if args.interface == 'telnet':
+        try:
+            ip, port = args.endpoint.split(':')
+            kwargs.update(ip=ip, port=int(port))
+        except ValueError:
+            stderr_log('bad endpoint: %s' % args.endpoint, 'err')
+            return EXIT_ARGS
+    else:
+        kwargs.update(serial=args.serial, dev_num=args.dev_num)
+        if args.fake:
+            from ns_sifake import NS_FakeSiDll
+            kwargs['si_dll'] = NS_FakeSiDll()
+
+    log = stderr_log if args.verbose else None
+    if args.verbose > 1:
+        kwargs['log'] = stderr_log
+
+    ns3 = NS3_Commander()
+    ns3.set_interface(**kwargs)
+    ns3.set_log(kwargs.get('log', None))
+
+    archive = None
+    if args.archive is not None:
+        from ns_archive import NS_CaptureArchive
+        archive = NS_CaptureArchive(args.archive)
+
+    golden = None
+    if args.golden is not None:
+        from ns_golden import NS_GoldenLibrary
+        golden = NS_GoldenLibrary(args.golden)
+
+    runner = NS_TestRunner(ns3, log=log, archive=archive, golden=golden, save_golden=args.save_golden)
+    passed = runner.run()
+    if archive is not None:
+        archive.close()
+
+    result = dict(runner.result)
+    result['interface'] = args.interface
+    result['startup_time'] = startup_time
+    result['run_time'] = perf_counter() - start_time
+
+    out = json.dumps(result, indent=2)
+    if args.out is not None:
+        with open(args.out, 'wt') as f:
+            f.write(out + '\n')
+    print(out)
+
+    if passed:
+        return EXIT_PASSED
+    if result.get('error') == 'connect':
+        return EXIT_CONNECT
+    return EXIT_FAILED
+
+
+startup_time = perf_counter() - start_time
+
+if __name__ == '__main__':
+    sys.exit(main())
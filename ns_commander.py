@@ -1,9 +1,8 @@
 #!python3
 
-from time import sleep
-from crc8 import ns_crc_buf
-from ns_siusbxp import NS_SiUSBXp
-from ns_telnet import NS_Telnet
+from time import sleep, monotonic
+from crc8 import ns_crc_buf, ns_crc_byte, ns_crc_update
+from ns_transport import ns_transport_name, ns_transport_caps, ns_transport_class
 
 
 # ns device return error code
@@ -100,6 +99,35 @@ ns_cmd = {
 }
 
 
+# make device frame from command: 'start' byte + command + crc
+def ns_frame(cmd):
+    cm = [0x5B] + cmd
+    cm.append(ns_crc_buf(cm))
+    return cm
+
+
+# sample bytes from 'get data' respond ('start' and 'crc' removed), last 'num' bytes
+def ns_data_samples(respond, num):
+    return bytes(respond[-num:])
+
+
+# close pooled session: 'disconnect' sent and ack read if session alive, then closed,
+# used as ns_pool.NS_ConnectionPool 'close' func
+def ns_session_close(interface):
+    cm = ns_frame(ns_cmd['disconnect'])
+    try:
+        if not interface.write(cm, len(cm)):
+            interface.read([], len(cm))
+    except Exception:
+        pass
+    interface.close()
+
+
+# offset of sample bytes in received 'get data' respond ('start' and 'crc' not removed),
+# for decode data in 'on_chunk' callback while transfer
+ns_data_offset = 8
+
+
 # empty log func, used if log func not defined
 # def nlg(msg, err): pass
 
@@ -114,6 +142,31 @@ class NS3_Commander(object):
         self.connected = 0
         self.mcu_firm_ver = 0.0
         self.write_respond = []
+        # keep-alive sessions pool, used for telnet interface only
+        self.pool = None
+        self.pool_key = None
+        # capability flags of current transport
+        self.caps = {}
+        # skip rx flush before command while respond stream is in sync
+        self.lazy_flush = False
+        self.in_sync = False
+        # commands of configuration burst, None - commands sent immediately,
+        # settings of burst commands recorded after all commands acked
+        self.deferred = None
+        self.deferred_acks = []
+        # last device error code from ns_err_list, 0 - no error
+        self.dev_error = 0
+        # current sweep mode name, used for decode 'get data' samples
+        self.sweep = 'standart'
+        # current sweep divider and channels dividers names, None - not set yet
+        self.sweep_time = None
+        self.adiv = { 'A': None, 'B': None }
+        # current syncronization settings names
+        self.sync = { 'mode': None, 'sourse': None, 'type': None }
+        # host-side channels auto range, created on first use, keep last ranges
+        self.ranger = None
+        # current trigger levels and LA masks
+        self.trig = { 'up': 0x80, 'down': 0x80, 'diff': 0xFF, 'cond': 0xFF }
 
     def set_log(self, log):
         if log is not None:
@@ -127,46 +180,87 @@ class NS3_Commander(object):
     def set_interface(self, **kwargs):
         # get interface, default usbxpress
         interface = kwargs.get('interface', 'usbxpress')
-
-        if 'usbxpress' in interface:
-            self.ns_interface = NS_SiUSBXp()
-
-        elif 'telnet' in interface:
+        self.pool = None
+        self.pool_key = None
+
+        # transport backend imported on first use
+        name = ns_transport_name(interface)
+        if name is None:
+            self.ns_interface = None
+            return 1
+
+        self.caps = ns_transport_caps(name)
+        self.lazy_flush = kwargs.get('lazy_flush', False)
+        self.in_sync = False
+        # backend get own args, for example 'si_dll', 'serial' or 'reader'
+        self.ns_interface = ns_transport_class(name)(**kwargs)
+        # coalesced command bursts split to transport max write size
+        self.ns_interface.set_max_frame(self.caps['max_frame'])
+
+        if self.caps['network']:
             ip = kwargs.get('ip', '192.168.1.119')
             port = kwargs.get('port', 2323)
-
-            self.ns_interface = NS_Telnet()
             self.ns_interface.set_ip_port( ip=ip, port=port )
 
+            # optional NS_ConnectionPool for reuse opened sessions
+            self.pool = kwargs.get('pool', None)
+            self.pool_key = (ip, port)
+            # expired pooled sessions disconnected from device before close
+            if self.pool is not None and self.pool.close_func is None:
+                self.pool.close_func = ns_session_close
+
         # set log callback, log func must be of the form: ' def nlg(msg, lvl) '
         interface_log = kwargs.get('log', None)
         # if interface_log == None:
         #     interface_log = NS3_Commander.nlg
         self.ns_interface.set_log(interface_log)
+        return 0
 
     # get and verify vid/pid
     def vid_pid(self):
         success = False
         vp = self.vidpid
-        if not self.ns_interface.get_vidpid(0, vp):
+        if not self.ns_interface.get_vidpid(self.ns_interface.open_dev, vp):
             if vp[0] == 0x10C4 and vp[1] == 0x8693:
                 success = True
 
         return success
 
+    # attached devices index, for usbxpress interface only
+    def devices(self, rescan = False):
+        if hasattr(self.ns_interface, 'enumerate'):
+            return self.ns_interface.enumerate(rescan)
+        return []
+
     # configurate baudrate and timeouts for work with device
     def interface_config(self, rtout, wtout, baud = 921600):
         st = self.ns_interface.setbr(baud) | self.ns_interface.set_timeout(rtout, wtout)
         return st
 
+    # flush interface rx buffers before command, skipped in 'lazy_flush' mode
+    # while all previous responds decoded successfully
+    def rx_flush(self):
+        if self.lazy_flush and self.in_sync:
+            return 0
+        return self.ns_interface.flush_bufers(0)
+
     # write command to device example: [0x5B, 0x00, 0x01, 0xFF]
     def write_cmd(self, cmd, **kwargs):
+        # between begin_cmds() and end_cmds() acked commands only queued
+        if self.deferred is not None:
+            if not kwargs:
+                self.deferred.append(list(cmd))
+                return 0
+            if self.end_cmds():
+                return 1
+            self.deferred = []
+
         self.lg('try send cmd', 'warn')
 
-        cm = [0x5B] + cmd
-        cm.append(ns_crc_buf(cm))
+        cm = ns_frame(cmd)
+        self.dev_error = 0
 
-        self.ns_interface.flush_bufers(0)
+        self.rx_flush()
         if not self.ns_interface.write(cm, len(cm)):
 
             # if read data len not provide set to same write message len
@@ -175,13 +269,25 @@ class NS3_Commander(object):
             self.write_respond = [0 in range(rlen)]
             rd = self.write_respond
 
-            if not self.ns_interface.read(rd, rlen) and not ns_crc_buf(rd):
+            # optional streaming read, callback called for each received chunk
+            on_chunk = kwargs.get('on_chunk', None)
+            if on_chunk is not None:
+                st = self.read_stream(rd, rlen, on_chunk)
+            else:
+                st = self.ns_interface.read(rd, rlen) or ns_crc_buf(rd)
+
+            if not st:
                 # remove 'start' and 'crc' bytes
-                rd.remove(rd[-1])
-                rd.remove(rd[0])
+                del rd[-1]
+                del rd[0]
                 if rd[0] == (cm[1] + 0x40) & 0xFF:  # if returned command byte = write command + 0x40
                     self.lg('cmd ack recived')
+                    self.in_sync = True
                     return 0
+                elif rd[0] == 0x7F:
+                    # device error respond, last byte - error code
+                    self.dev_error = rd[-1]
+                    err_msg = 'device error %s' % ns_err_list.get(rd[-1], hex(rd[-1]))
                 else:
                     err_msg = 'cmd ack error'
 
@@ -192,14 +298,117 @@ class NS3_Commander(object):
             err_msg = 'write cmd error'
 
         self.lg(err_msg, 'err')
+        self.in_sync = False
         return 1
 
+    # streaming read of respond, crc calculated incrementally and
+    # callback ' def on_chunk(received, chunk) ' called for each received chunk
+    def read_stream(self, rd, rlen, on_chunk):
+        interface = self.ns_interface
+
+        if not self.caps.get('streaming', False):
+            st = interface.read(rd, rlen)
+            on_chunk(len(rd), memoryview(bytes(rd)))
+            return st or ns_crc_buf(rd)
+
+        buf = bytearray(rlen)
+        crc = 0
+        got = 0
+        for got, chunk in interface.read_stream(buf, rlen):
+            crc = ns_crc_update(chunk, crc)
+            on_chunk(got, chunk)
+
+        rd[:] = buf[:got]
+        return got < rlen or ns_crc_byte(0, crc)
+
+    # write several commands with one coalesced transfer, then read all acks in order
+    def write_cmds(self, cmds):
+        # transport can't pipeline - send one by one
+        if not self.caps.get('pipelining', False):
+            for cmd in cmds:
+                if self.write_cmd(cmd):
+                    return 1
+            return 0
+
+        self.lg('try send %d cmds' % len(cmds), 'warn')
+
+        frames = [ns_frame(cmd) for cmd in cmds]
+        interface = self.ns_interface
+
+        self.rx_flush()
+        for cm in frames:
+            st = interface.enqueue(cm)
+            if st:
+                interface.drop_queued()
+                break
+        else:
+            st = interface.send_queued()
+
+        if st:
+            err_msg = 'write cmds error'
+        else:
+            err_msg = None
+            for cm in frames:
+                rd = []
+                if interface.read(rd, len(cm)) or ns_crc_buf(rd) or len(rd) < 3:
+                    err_msg = 'cmd read or ack error'
+                    break
+                if rd[1] != (cm[1] + 0x40) & 0xFF:
+                    err_msg = 'cmd ack error'
+                    break
+
+        if err_msg is not None:
+            self.lg(err_msg, 'err')
+            self.in_sync = False
+            return 1
+
+        self.lg('%d cmds ack recived' % len(frames))
+        self.in_sync = True
+        return 0
+
+    # start configuration burst, next acked commands (for example ach_div,
+    # sync_mode) queued and sent with one coalesced write_cmds by end_cmds()
+    def begin_cmds(self):
+        self.deferred = []
+        self.deferred_acks = []
+
+    # send queued configuration burst, return 0 if all commands acked,
+    # settings of burst commands recorded only if all acked
+    def end_cmds(self):
+        cmds, acks = self.deferred, self.deferred_acks
+        self.deferred = None
+        self.deferred_acks = []
+        if cmds and self.write_cmds(cmds):
+            return 1
+        for func, args in acks:
+            func(*args)
+        return 0
+
+    # record setting of acked command by ' func(*args) ', 'ws' - command write status,
+    # in configuration burst recorded by end_cmds() after burst acked
+    def acked(self, ws, func, *args):
+        if not ws:
+            if self.deferred is not None:
+                self.deferred_acks.append((func, args))
+            else:
+                func(*args)
+        return ws
+
     # connect to device
     def connect(self):
         """ """
         interface = self.ns_interface
         self.lg('connecting with %s' % interface.__class__.__name__)
 
+        # try reuse alive session from pool, skip open and handshake
+        if self.pool is not None:
+            session = self.pool.acquire(self.pool_key, self.session_check)
+            if session is not None:
+                session[0].set_log(interface.lg)
+                self.ns_interface, self.mcu_firm_ver = session
+                self.lg('pooled session reused')
+                return 0
+
         # get connected devices, open, verify descr dev string, verify vid/pid
         if interface is not None and not interface.connect() and self.vid_pid():
             self.lg('device found')
@@ -207,11 +416,17 @@ class NS3_Commander(object):
             # NeilScope device identified OK, try open, set si_settigs and init PC mode
             if not ( self.interface_config(5000, 5000) | self.write_cmd( ns_cmd['connect'] ) ): #ns_cmd['connect']
                   self.lg('connect OK')
-                  sleep(0.5)
 
-                  # get firmware version
+                  # get firmware version, polled until device ready, max 0.5 sec
+                  # each probe read limited by rest of poll time
                   firm_ver = [0.0]
-                  if not self.get_fw_ver(firm_ver):
+                  deadline = monotonic() + 0.5
+                  st = self.limited(deadline - monotonic(), self.get_fw_ver, firm_ver)
+                  while st and monotonic() < deadline:
+                      sleep(0.01)
+                      st = self.limited(deadline - monotonic(), self.get_fw_ver, firm_ver)
+
+                  if not st:
                       self.mcu_firm_ver = firm_ver[0]
 
                       # return successfull connect
@@ -224,8 +439,28 @@ class NS3_Commander(object):
 
         return 1
 
+    # health check for pooled session, return 0 if device respond,
+    # dropped connection (EOFError, OSError from socket) is not alive session
+    def session_check(self, interface):
+        current = self.ns_interface
+        self.ns_interface = interface
+        try:
+            st = self.get_batt([0])
+        except Exception as ex:
+            self.lg('pooled session check error: %s' % ex, 'warn')
+            st = 1
+        finally:
+            self.ns_interface = current
+        return st
+
     # disconnect from device
     def disconnect(self):
+        # keep session opened if pool used
+        if self.pool is not None and \
+           self.pool.release(self.pool_key, self.ns_interface, self.mcu_firm_ver):
+            self.lg('session returned to pool')
+            return 0
+
         st = self.write_cmd(ns_cmd['disconnect'])
 
         if not st: self.lg('diconnected')
@@ -261,74 +496,148 @@ class NS3_Commander(object):
         else: div = [st, st]
 
         ns_cmd['analog div'][-2:] = div
-        return self.write_cmd(ns_cmd['analog div'])
+        ws = self.write_cmd(ns_cmd['analog div'])
+        for c in ch:
+            self.acked(ws, self.adiv.__setitem__, c, param[1])
+        return ws
+
+    # auto range of channel 'A' or 'B' by short probe captures, see ns_autorange,
+    # chosen divider name returned in param[1]
+    def ach_autorange(self, param = ['A', []]):
+        if self.ranger is None:
+            from ns_autorange import NS_AutoRange
+            self.ranger = NS_AutoRange(self)
+
+        st, name = self.ranger.search(param[0])
+        if not st:
+            self.lg('auto range ch %s: %s, %d probes' % (param[0], name, self.ranger.probes))
+            param[1][:] = [name]
+        return st
 
     # set syncronization mode
     def sync_mode(self, param = ['off']):
-        ns_cmd['analog div'][-1] = ns_sync_mode[param[0]]
-        return self.write_cmd(ns_cmd['analog div'])
+        ns_cmd['sync mode'][-1] = ns_sync_mode[param[0]]
+        ws = self.write_cmd(ns_cmd['sync mode'])
+        return self.acked(ws, self.sync.__setitem__, 'mode', param[0])
 
     # set syncronization sourse
     def sync_sourse(self, param = ['A']):
         ns_cmd['sync sourse'][-1] = ns_channels[param[0]]
-        return self.write_cmd(ns_cmd['sync sourse'])
+        ws = self.write_cmd(ns_cmd['sync sourse'])
+        return self.acked(ws, self.sync.__setitem__, 'sourse', param[0])
 
     # set syncronization type
     def sync_type(self, param = ['rise']):
         ns_cmd['sync type'][-1] = ns_sync_type[param[0]]
-        return self.write_cmd(ns_cmd['sync type'])
+        ws = self.write_cmd(ns_cmd['sync type'])
+        return self.acked(ws, self.sync.__setitem__, 'type', param[0])
 
     # set trigger 'UP'
     def triggUP(self, param = [0x80]):
         ns_cmd['trig UP'][-1] = param[0]
-        return self.write_cmd(ns_cmd['trig UP'])
+        ws = self.write_cmd(ns_cmd['trig UP'])
+        return self.acked(ws, self.trig.__setitem__, 'up', param[0])
 
     # set trigger 'DOWN'
     def triggDOWN(self, param = [0x80]):
         ns_cmd['trig DOWN'][-1] = param[0]
-        return self.write_cmd(ns_cmd['trig DOWN'])
+        ws = self.write_cmd(ns_cmd['trig DOWN'])
+        return self.acked(ws, self.trig.__setitem__, 'down', param[0])
 
     # set trigger X position
     def triggX(self, param = [0x000001]):
-        ns_cmd['trig X'][-3] = [ param[0]>>16, param[0]>>8, param[0] ]
+        ns_cmd['trig X'][-3:] = [ (param[0]>>16)&0xFF, (param[0]>>8)&0xFF, param[0]&0xFF ]
         return self.write_cmd(ns_cmd['trig X'])
 
     # set la trigger mask different
     def la_mask_diff(self, param = [0xFF]):
         ns_cmd['trig mask diff'][-1] = param[0]
-        return self.write_cmd(ns_cmd['trig mask diff'])
+        ws = self.write_cmd(ns_cmd['trig mask diff'])
+        return self.acked(ws, self.trig.__setitem__, 'diff', param[0])
 
     # set la trigger mask condition
     def la_mask_cond(self, param = [0xFF]):
         ns_cmd['trig mask cond'][-1] = param[0]
-        return self.write_cmd(ns_cmd['trig mask cond'])
+        ws = self.write_cmd(ns_cmd['trig mask cond'])
+        return self.acked(ws, self.trig.__setitem__, 'cond', param[0])
 
     # set sweep divider
     def sweep_div(self, param = ['1uS']):
         ns_cmd['sweep div'][-1] = ns_sweep_div[param[0]]
-        return self.write_cmd(ns_cmd['sweep div'])
+        ws = self.write_cmd(ns_cmd['sweep div'])
+        return self.acked(ws, setattr, self, 'sweep_time', param[0])
 
     # set sweep mode
     def sweep_mode(self, param = ['standart']):
         ns_cmd['sweep mode'][-1] = ns_sweep_mode[param[0]]
-        return self.write_cmd(ns_cmd['sweep mode'])
+        ws = self.write_cmd(ns_cmd['sweep mode'])
+        return self.acked(ws, setattr, self, 'sweep', param[0])
 
-    # data reques from selected channel - 'A', 'B', 'LA'
-    def get_data(self, param = ['A', 100, []]):
+    # data reques from selected channel - 'A', 'B', 'LA', optional 'on_chunk'
+    # callback for process data while transfer, see read_stream
+    def get_data(self, param = ['A', 100, []], on_chunk = None):
 
         num = param[1]
         ns_cmd['get data'][-4:-1] = [(num>>10)&0xFF, (num>>2)&0xFF, (num<<6)&0xFF]
-        if param[0] == 'A':
-            ns_cmd['get data'][-1] = 0x00
-        elif param[0] == 'B':
-            ns_cmd['get data'][-1] = 0x01
+        ns_cmd['get data'][-1] = ns_channels[param[0]]
 
-        ws = self.write_cmd(ns_cmd['get data'], rlen=num+9)
+        ws = self.write_cmd(ns_cmd['get data'], rlen=num+9, on_chunk=on_chunk)
         if not ws:
             param[2][:] = []
             param[2].append(self.write_respond)
         return ws
 
+    # current settings codes of channel capture, 0xFF - not known
+    def capture_settings(self, ch):
+        return {
+            'channel': ns_channels[ch],
+            'sweep_div': ns_sweep_div.get(self.sweep_time, 0xFF),
+            'adiv': ns_adiv.get(self.adiv.get(ch, None), 0xFF),
+            'sweep_mode': ns_sweep_mode[self.sweep],
+        }
+
+    # channel capture configuration tuple, used as key of reference captures:
+    # (channel, sweep div, channel div, sweep mode, sync mode, sync sourse, sync type, samples)
+    def config_key(self, ch, num):
+        return (ch, self.sweep_time, self.adiv.get(ch, None), self.sweep,
+                self.sync['mode'], self.sync['sourse'], self.sync['type'], num)
+
+    # current device trigger as ns_trigger.ns_trigger_find kwargs
+    def trigger_settings(self):
+        return dict(self.trig, sync_type=self.sync['type'] or 'rise')
+
+    # device name: 'ip:port' for network, serial or device number for USB
+    def device_name(self):
+        if self.pool_key is not None:
+            return '%s:%d' % self.pool_key
+        claimed = getattr(self.ns_interface, 'claimed', None)
+        if claimed:
+            return claimed[0]
+        return 'usb%d' % getattr(self.ns_interface, 'open_dev', 0)
+
+    # call ' func(*args) ' with interface read timeout limited to 'timeout' sec,
+    # interface read and write timeouts restored after
+    def limited(self, timeout, func, *args):
+        interface = self.ns_interface
+        rt, wt = interface.read_timeout, interface.write_timeout
+        interface.set_timeout(max(int(timeout * 1000), 1), wt)
+        try:
+            return func(*args)
+        finally:
+            interface.set_timeout(rt, wt)
+
+    # readiness probe, cheap 'batt' request, return 0 if device ack without BUSY,
+    # 'timeout' - max probe read time in sec
+    def ready(self, param = [], timeout = None):
+        if timeout is None:
+            st = self.write_cmd(ns_cmd['batt'])
+        else:
+            st = self.limited(timeout, self.write_cmd, ns_cmd['batt'])
+
+        if st and self.dev_error == 0x03:
+            self.lg('device busy', 'warn')
+        return st
+
     # get batt voltage level in procents
     def get_batt(self, param = [0]):
         ws = self.write_cmd(ns_cmd['batt'])
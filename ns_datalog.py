@@ -0,0 +1,308 @@
+#!python3
+
+# continuous data logger, device captures repeated and streamed to disk for hours
+#
+# usage: python ns_datalog.py --interface telnet --endpoint 192.168.1.119:2323 --hours 12
+#        python ns_datalog.py --fake --seconds 10
+
+import os
+import sys
+import mmap
+import errno
+import json
+import struct
+import argparse
+import threading
+from queue import Queue, Full, Empty
+from datetime import datetime
+from time import time, sleep, monotonic, perf_counter
+
+
+# segment file header: magic, start time, end of written frames
+ns_seg_header = struct.Struct('<4sdQ')
+ns_seg_magic = b'NSL2'
+ns_seg_end_offset = 12
+# frame record header: time, channel code, samples bytes
+ns_frame_header = struct.Struct('<dBI')
+
+
+# preallocated memory-mapped segment files, new segment started by size or time,
+# segment truncated to written size when closed, end of written frames kept
+# in header so live or not closed (crashed) segment readable
+class NS_SegmentWriter(object):
+    """ segment files writer """
+
+    def __init__(self, path, **kwargs):
+        """ constructor """
+        self.path = path
+        self.segment_bytes = kwargs.get('segment_bytes', 64 << 20)
+        self.segment_seconds = kwargs.get('segment_seconds', 3600)
+        os.makedirs(path, exist_ok=True)
+
+        self.file = None
+        self.mm = None
+        self.pos = 0
+        self.started = 0
+        self.segments = 0
+        self.names = []
+
+    def open_segment(self):
+        self.close_segment()
+        t = time()
+        name = os.path.join(self.path, datetime.fromtimestamp(t).strftime('seg_%Y%m%d_%H%M%S') +
+                            '_%04d.bin' % self.segments)
+        self.file = open(name, 'w+b')
+        try:
+            self.allocate()
+            self.mm = mmap.mmap(self.file.fileno(), self.segment_bytes)
+        except OSError:
+            self.file.close()
+            self.file = None
+            os.remove(name)
+            raise
+        self.mm[:ns_seg_header.size] = ns_seg_header.pack(ns_seg_magic, t, ns_seg_header.size)
+        self.pos = ns_seg_header.size
+        self.started = monotonic()
+        self.segments += 1
+        self.names.append(name)
+
+    # reserve disk blocks of segment, full disk is OSError here and not
+    # SIGBUS on mapped write, sparse file if file system can't allocate
+    def allocate(self):
+        if hasattr(os, 'posix_fallocate'):
+            try:
+                os.posix_fallocate(self.file.fileno(), 0, self.segment_bytes)
+                return
+            except OSError as ex:
+                if ex.errno not in (errno.EOPNOTSUPP, errno.EINVAL):
+                    raise
+        self.file.truncate(self.segment_bytes)
+
+    def close_segment(self):
+        if self.mm is not None:
+            self.mm.flush()
+            self.mm.close()
+            self.file.truncate(self.pos)
+            self.file.close()
+            self.mm = None
+            self.file = None
+
+    # write frame, return written bytes
+    def write(self, t, channel, samples):
+        n = ns_frame_header.size + len(samples)
+        # checked before rotation, not fit frame not leave new segment files
+        if n > self.segment_bytes - ns_seg_header.size:
+            raise ValueError('frame bigger than segment')
+
+        if (self.mm is None or self.pos + n > self.segment_bytes or
+                monotonic() - self.started > self.segment_seconds):
+            self.open_segment()
+
+        self.mm[self.pos + ns_frame_header.size:self.pos + n] = samples
+        ns_frame_header.pack_into(self.mm, self.pos, t, channel, len(samples))
+        self.pos += n
+        struct.pack_into('<Q', self.mm, ns_seg_end_offset, self.pos)
+        return n
+
+    def close(self):
+        self.close_segment()
+
+
+# frames of segment file, yield (time, channel code, samples memoryview of mapped file),
+# read up to end of written frames, not preallocated tail
+def ns_read_segment(name):
+    if os.path.getsize(name) < ns_seg_header.size:
+        return
+    with open(name, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mm)
+    magic, start, end = ns_seg_header.unpack_from(mm, 0)
+    if magic != ns_seg_magic:
+        return
+
+    end = min(end, len(mm))
+    pos = ns_seg_header.size
+    while pos + ns_frame_header.size <= end:
+        t, ch, nbytes = ns_frame_header.unpack_from(mm, pos)
+        # zero filled or cut frame - not written
+        if not t or pos + ns_frame_header.size + nbytes > end:
+            return
+        pos += ns_frame_header.size
+        yield t, ch, view[pos:pos + nbytes]
+        pos += nbytes
+
+
+# acquisition loop put captures to bounded queue and never wait for disk,
+# frame dropped if queue full, writer thread stream frames to segment files
+class NS_DataLogger(object):
+    """ continuous capture logger """
+
+    def __init__(self, ns3, writer, **kwargs):
+        """ constructor """
+        self.ns3 = ns3
+        self.writer = writer
+        self.channels = kwargs.get('channels', ['A'])
+        self.num = kwargs.get('num', 1000)
+        # pause between captures, sec
+        self.interval = kwargs.get('interval', 0.0)
+        self.queue = Queue(maxsize=kwargs.get('queue_size', 64))
+        # log func must be of the form: ' def nlg(msg, lvl) '
+        self.lg = kwargs.get('log', None) or (lambda msg, lvl='': None)
+
+        self.running = False
+        self.acq_thread = None
+        self.wr_thread = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.frames = 0
+        self.dropped = 0
+        self.errors = 0
+        self.written = 0
+        self.bytes = 0
+        self.queue_max = 0
+        self.write_max = 0.0
+        self.started = monotonic()
+
+    # statistic dict, 'dropped' - frames lost by full queue (writer not keep up)
+    def stats(self):
+        return {
+            'elapsed': monotonic() - self.started,
+            'frames': self.frames,
+            'written': self.written,
+            'dropped': self.dropped,
+            'errors': self.errors,
+            'bytes': self.bytes,
+            'queue': self.queue.qsize(),
+            'queue_max': self.queue_max,
+            'write_max': self.write_max,
+            'segments': self.writer.segments,
+        }
+
+    def start(self):
+        from ns_commander import ns_channels
+        self.codes = { ch: ns_channels[ch] for ch in self.channels }
+
+        self.running = True
+        self.reset_stats()
+        self.wr_thread = threading.Thread(target=self.write_loop)
+        self.wr_thread.daemon = True
+        self.wr_thread.start()
+        self.acq_thread = threading.Thread(target=self.acq_loop)
+        self.acq_thread.daemon = True
+        self.acq_thread.start()
+
+    # stop acquisition, wait all queued frames written
+    def stop(self):
+        self.running = False
+        if self.acq_thread is not None:
+            self.acq_thread.join()
+        if self.wr_thread is not None:
+            self.queue.put(None)
+            self.wr_thread.join()
+        self.acq_thread = None
+        self.wr_thread = None
+        self.writer.close()
+
+    def acq_loop(self):
+        from ns_commander import ns_data_samples
+
+        while self.running:
+            for ch in self.channels:
+                rd = []
+                if self.ns3.get_data([ch, self.num, rd]):
+                    self.errors += 1
+                    self.lg('get data ch %s error' % ch, 'err')
+                    continue
+
+                self.frames += 1
+                try:
+                    self.queue.put_nowait((time(), self.codes[ch], ns_data_samples(rd[0], self.num)))
+                except Full:
+                    self.dropped += 1
+                    continue
+                self.queue_max = max(self.queue_max, self.queue.qsize())
+
+            if self.interval:
+                sleep(self.interval)
+
+    def write_loop(self):
+        while True:
+            try:
+                item = self.queue.get(timeout=1.0)
+            except Empty:
+                continue
+            if item is None:
+                return
+
+            start = perf_counter()
+            try:
+                self.bytes += self.writer.write(*item)
+                self.written += 1
+            except (OSError, ValueError) as ex:
+                self.lg('write error: %s' % ex, 'err')
+            self.write_max = max(self.write_max, perf_counter() - start)
+
+
+def stderr_log(msg, lvl=''):
+    sys.stderr.write('%s: %s\n' % (lvl or '-', msg.strip('\r\n')))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='NeilScope 3 continuous data logger')
+    parser.add_argument('--interface', default='usbxpress', choices=['usbxpress', 'telnet'])
+    parser.add_argument('--endpoint', default='192.168.1.119:2323', help='telnet ip:port')
+    parser.add_argument('--fake', action='store_true', help='use fake USBXpress dll, for dry run')
+    parser.add_argument('--lazy-flush', action='store_true',
+                        help='skip interface rx flush before command while responds in sync')
+    parser.add_argument('--channels', default='A', help='channels list, for example A,B')
+    parser.add_argument('--num', type=int, default=1000, help='samples per capture')
+    parser.add_argument('--interval', type=float, default=0.0, help='pause between captures, sec')
+    parser.add_argument('--hours', type=float, default=0.0)
+    parser.add_argument('--seconds', type=float, default=0.0)
+    parser.add_argument('--path', default='datalog', help='segment files folder')
+    parser.add_argument('--segment-mb', type=int, default=64)
+    parser.add_argument('--segment-minutes', type=float, default=60.0)
+    parser.add_argument('--queue', type=int, default=64, help='max frames waiting for write')
+    parser.add_argument('--report', type=float, default=10.0, help='statistic report period, sec')
+    args = parser.parse_args(argv)
+
+    from ns_commander import NS3_Commander
+
+    kwargs = { 'interface': args.interface, 'lazy_flush': args.lazy_flush }
+    if args.interface == 'telnet':
+        ip, port = args.endpoint.split(':')
+        kwargs.update(ip=ip, port=int(port))
+    elif args.fake:
+        from ns_sifake import NS_FakeSiDll
+        kwargs['si_dll'] = NS_FakeSiDll()
+
+    ns3 = NS3_Commander()
+    ns3.set_interface(**kwargs)
+    ns3.set_log(None)
+    if ns3.connect():
+        stderr_log('connect to device failed', 'err')
+        return 2
+
+    writer = NS_SegmentWriter(args.path, segment_bytes=args.segment_mb << 20,
+                              segment_seconds=args.segment_minutes * 60)
+    logger = NS_DataLogger(ns3, writer, channels=args.channels.split(','), num=args.num,
+                           interval=args.interval, queue_size=args.queue, log=stderr_log)
+
+    duration = args.hours * 3600 + args.seconds
+    logger.start()
+    try:
+        while not duration or logger.stats()['elapsed'] < duration:
+            sleep(min(args.report, duration or args.report))
+            stderr_log(json.dumps(logger.stats()), 'inf')
+    except KeyboardInterrupt:
+        pass
+    logger.stop()
+    ns3.disconnect()
+
+    print(json.dumps(logger.stats(), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
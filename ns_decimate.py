@@ -0,0 +1,147 @@
+#!python3
+
+import sys
+import numpy as np
+from time import perf_counter
+
+
+# bin start indexes of 'columns' equal bins over 'n' samples, columns <= n
+def ns_bins(n, columns):
+    return np.linspace(0, n, columns + 1)[:-1].astype(np.intp)
+
+
+# per-column min/max envelope of samples, return (mins, maxs), empty for no samples
+def ns_minmax(y, columns):
+    y = np.asarray(y)
+    n = len(y)
+    if not n:
+        return y[:0], y[:0]
+    columns = max(1, min(columns, n))
+
+    if n % columns == 0:
+        blk = y.reshape(columns, -1)
+        return blk.min(axis=1), blk.max(axis=1)
+
+    edges = ns_bins(n, columns)
+    return np.minimum.reduceat(y, edges), np.maximum.reduceat(y, edges)
+
+
+# largest triangle three buckets downsampling, return indexes of selected samples
+def ns_lttb(y, threshold, x=None):
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    if x is None:
+        x = np.arange(n, dtype=np.float64)
+    else:
+        x = np.asarray(x, dtype=np.float64)
+
+    # first and last samples always selected, others in 'threshold - 2' buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.intp)
+    counts = np.diff(edges)
+
+    # bucket averages, next bucket average used as third triangle point
+    avg_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / counts
+    avg_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / counts
+    avg_x = np.append(avg_x[1:], x[-1])
+    avg_y = np.append(avg_y[1:], y[-1])
+
+    out = np.empty(threshold, dtype=np.intp)
+    out[0] = 0
+    out[-1] = n - 1
+
+    a = 0
+    for j in range(threshold - 2):
+        lo, hi = edges[j], edges[j + 1]
+        xa, ya = x[a], y[a]
+        area = np.abs((xa - avg_x[j]) * (y[lo:hi] - ya) - (xa - x[lo:hi]) * (avg_y[j] - ya))
+        a = lo + int(np.argmax(area))
+        out[j + 1] = a
+
+    return out
+
+
+# precomputed multi-resolution min/max pyramid, each level reduce
+# previous by 'factor', used for fast re-decimation on zoom and pan
+class NS_DecimationPyramid(object):
+    """ min/max decimation pyramid """
+
+    def __init__(self, y, factor=4, min_len=256):
+        """ constructor """
+        self.y = np.asarray(y)
+        self.factor = factor
+        # [ (block size in samples, mins, maxs), ... ]
+        self.levels = []
+
+        mins = maxs = self.y
+        block = 1
+        while len(mins) // factor >= min_len:
+            pad = -len(mins) % factor
+            if pad:
+                mins = np.pad(mins, (0, pad), mode='edge')
+                maxs = np.pad(maxs, (0, pad), mode='edge')
+            mins = mins.reshape(-1, factor).min(axis=1)
+            maxs = maxs.reshape(-1, factor).max(axis=1)
+            block *= factor
+            self.levels.append((block, mins, maxs))
+
+    def __len__(self):
+        return len(self.y)
+
+    # min/max envelope of samples [start, stop) for 'columns' columns,
+    # return (column start sample indexes, mins, maxs), empty for no samples
+    def envelope(self, start, stop, columns):
+        start = max(0, int(start))
+        stop = min(len(self.y), int(stop))
+        n = stop - start
+        if n <= 0:
+            return np.empty(0, dtype=np.intp), self.y[:0], self.y[:0]
+        columns = max(1, min(columns, n))
+
+        # coarsest level with block not more samples per column
+        block, mins, maxs = 1, self.y, self.y
+        for level in self.levels:
+            if level[0] * columns > n:
+                break
+            block, mins, maxs = level
+
+        a = start // block
+        b = -(-stop // block)
+        columns = min(columns, b - a)
+
+        edges = ns_bins(b - a, columns)
+        x = (a + edges) * block
+        x[0] = start
+
+        mins = np.minimum.reduceat(mins[a:b], edges)
+        maxs = np.maximum.reduceat(maxs[a:b], edges)
+        return x, mins, maxs
+
+
+if __name__ == '__main__':
+
+    # benchmark, usage: python ns_decimate.py [samples] [columns]
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000000
+    columns = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    y = np.random.randint(0, 256, n).astype(np.uint8)
+
+    t = perf_counter()
+    ns_minmax(y, columns)
+    print('min/max %d -> %d: %.2f ms' % (n, columns, (perf_counter() - t) * 1000))
+
+    t = perf_counter()
+    pyr = NS_DecimationPyramid(y)
+    print('pyramid build: %.2f ms, %d levels' % ((perf_counter() - t) * 1000, len(pyr.levels)))
+
+    for span in (n, n // 10, n // 1000, columns * 2):
+        t = perf_counter()
+        for j in range(100):
+            pyr.envelope(n // 3, n // 3 + span, columns)
+        print('envelope %d samples: %.3f ms' % (span, (perf_counter() - t) * 10))
+
+    t = perf_counter()
+    ns_lttb(y[:1000000], columns)
+    print('lttb 1000000 -> %d: %.2f ms' % (columns, (perf_counter() - t) * 1000))
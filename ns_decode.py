@@ -0,0 +1,78 @@
+#!python3
+
+import sys
+import numpy as np
+from time import perf_counter
+from ns_rle import NS_RLEDecoder
+
+
+# capture samples as uint8 array, bytes/bytearray/memoryview wrapped without copy
+def ns_samples_array(samples):
+    if isinstance(samples, np.ndarray):
+        return samples.view(np.uint8) if samples.dtype != np.uint8 else samples
+    if isinstance(samples, (bytes, bytearray, memoryview)):
+        return np.frombuffer(samples, dtype=np.uint8)
+    return np.asarray(samples, dtype=np.uint8)
+
+
+# 'standart' sweep - one sample per point
+def ns_decode_standart(samples):
+    return { 'y': ns_samples_array(samples) }
+
+
+# 'min max' sweep - device send (min, max) pair per point, return envelope
+# arrays as strided views of capture buffer
+def ns_decode_minmax(samples):
+    a = ns_samples_array(samples)
+    a = a[:len(a) & ~1]
+    return { 'min': a[0::2], 'max': a[1::2] }
+
+
+# 'interlive' sweep - two ADC sampling in turn on one channel (200Msps),
+# capture already in time order, each ADC phase is strided view of it,
+# used for per-phase offset/gain correction
+def ns_decode_interleave(samples):
+    a = ns_samples_array(samples)
+    return { 'y': a, 'phase0': a[0::2], 'phase1': a[1::2] }
+
+
+# 'la RLE' sweep - logic analyzer (state, run) pairs, return compact arrays,
+# samples expanded by NS_RLEDecoder.expand() for needed window only
+def ns_decode_rle(samples):
+    dec = NS_RLEDecoder()
+    dec.feed(ns_samples_array(samples))
+    return { 'values': dec.values(), 'runs': dec.runs(), 'decoder': dec }
+
+
+# decoders by sweep mode name, see ns_commander.ns_sweep_mode
+ns_decoders = {
+    'standart': ns_decode_standart,
+    'min max': ns_decode_minmax,
+    'interlive': ns_decode_interleave,
+    'la RLE': ns_decode_rle,
+}
+
+
+# decode capture samples of sweep mode, return dict of named arrays
+# or None if mode have no decoder
+def ns_decode(mode, samples):
+    decoder = ns_decoders.get(mode, None)
+    if decoder is None:
+        return None
+    return decoder(samples)
+
+
+if __name__ == '__main__':
+
+    # benchmark, usage: python ns_decode.py [samples]
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1 << 20
+    raw = bytes(np.random.randint(0, 256, n).astype(np.uint8))
+    base = np.frombuffer(raw, dtype=np.uint8)
+
+    for mode in ns_decoders:
+        t = perf_counter()
+        for j in range(1000):
+            d = ns_decode(mode, raw)
+        t = (perf_counter() - t) / 1000
+        copy = not all(np.shares_memory(v, base) for v in d.values() if isinstance(v, np.ndarray))
+        print('%-10s %d bytes: %.2f us, copy: %s' % (mode, n, t * 1e6, copy))
@@ -0,0 +1,124 @@
+#!python3
+
+import sys
+import socket
+import ipaddress
+from time import monotonic
+from concurrent.futures import ThreadPoolExecutor
+from crc8 import ns_crc_buf
+from ns_commander import ns_cmd, ns_frame
+
+
+# telnet 'Interpret As Command' byte, must be doubled in sended data
+IAC = b'\xff'
+
+
+# get hosts list from address range string:
+# '192.168.1.0/24', '192.168.1.10-40', '192.168.1.119' or list of this strings
+def ns_hosts(addr):
+    if not isinstance(addr, str):
+        hosts = []
+        for a in addr:
+            hosts += ns_hosts(a)
+        return hosts
+
+    if '/' in addr:
+        net = ipaddress.ip_network(addr, strict=False)
+        hosts = [str(h) for h in net.hosts()]
+        return hosts if hosts else [str(net.network_address)]
+
+    if '-' in addr:
+        first, last = addr.split('-')
+        base = first.rsplit('.', 1)
+        if '.' in last:
+            last = last.rsplit('.', 1)[1]
+        return ['%s.%d' % (base[0], n) for n in range(int(base[1]), int(last) + 1)]
+
+    return [addr]
+
+
+# send command frame and read device ack, return respond or None
+def ns_exchange(sock, cmd, deadline):
+    cm = ns_frame(cmd)
+    sock.sendall(bytes(cm).replace(IAC, IAC + IAC))
+
+    rd = b''
+    while len(rd) < len(cm):
+        tout = deadline - monotonic()
+        if tout <= 0:
+            return None
+        sock.settimeout(tout)
+        a = sock.recv(len(cm) - len(rd))
+        if not a:
+            return None
+        rd += a
+
+    # verify crc and returned command byte = write command + 0x40
+    if ns_crc_buf(rd) or rd[1] != (cm[1] + 0x40) & 0xFF:
+        return None
+    return rd
+
+
+# probe one endpoint, return device info dict or None
+def ns_probe(ip, port, timeout=0.25):
+    start = monotonic()
+    try:
+        sock = socket.create_connection((ip, port), timeout)
+    except OSError:
+        return None
+
+    dev = None
+    try:
+        deadline = monotonic() + timeout
+        if ns_exchange(sock, ns_cmd['connect'], deadline) is not None:
+            t = monotonic()
+            rd = ns_exchange(sock, ns_cmd['mcu fw ver'], t + timeout)
+            if rd is not None:
+                dev = {
+                    'ip': ip,
+                    'port': port,
+                    'fw_ver': float(rd[-2]) / 10,
+                    'rtt': monotonic() - t,
+                    'probe_time': monotonic() - start,
+                }
+                ns_exchange(sock, ns_cmd['disconnect'], monotonic() + timeout)
+    except OSError:
+        pass
+    finally:
+        sock.close()
+
+    return dev
+
+
+# probe all hosts/ports concurrently, return found devices ranked by round-trip latency
+def ns_discover(hosts, ports=(2323,), **kwargs):
+    timeout = kwargs.get('timeout', 0.25)
+    workers = kwargs.get('workers', 64)
+    log = kwargs.get('log', None)
+
+    if isinstance(ports, int):
+        ports = (ports,)
+
+    targets = [(ip, port) for ip in ns_hosts(hosts) for port in ports]
+    if not targets:
+        return []
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(targets))) as ex:
+        found = [d for d in ex.map(lambda t: ns_probe(t[0], t[1], timeout), targets) if d is not None]
+
+    found.sort(key=lambda d: d['rtt'])
+    if log is not None:
+        for d in found:
+            log('\'discover\' found %s:%d fw ver %.1f rtt %.2f ms' %
+                (d['ip'], d['port'], d['fw_ver'], d['rtt'] * 1000), 'inf')
+    return found
+
+
+if __name__ == '__main__':
+
+    # usage: python ns_discover.py 192.168.1.0/24 [port, ...]
+    hosts = sys.argv[1] if len(sys.argv) > 1 else '192.168.1.0/24'
+    ports = [int(p) for p in sys.argv[2:]] or [2323]
+
+    for d in ns_discover(hosts, ports):
+        print('%s:%d  fw %.1f  rtt %.2f ms' % (d['ip'], d['port'], d['fw_ver'], d['rtt'] * 1000))
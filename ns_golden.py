@@ -0,0 +1,176 @@
+#!python3
+
+import os
+import re
+import sys
+import threading
+import numpy as np
+from collections import OrderedDict
+from time import perf_counter
+from ns_measure import ns_batch
+
+
+# reference file name from configuration key, see NS3_Commander.config_key
+def ns_key_name(key):
+    return re.sub(r'[^0-9A-Za-z.]+', '-', '_'.join(str(k) for k in key)) + '.npz'
+
+
+# best alignment lag and normalized cross-correlation of each capture to reference,
+# lags searched in [-max_shift, max_shift], cross-correlation of all batch by FFT,
+# each lag normalized by energy of overlapped parts of capture and reference
+def ns_align(y, ref, max_shift):
+    n, length = y.shape
+    max_shift = min(max_shift, length - 1)
+    a = y - y.mean(axis=1, keepdims=True)
+    b = ref - ref.mean()
+
+    size = 1 << int(2 * length - 1).bit_length()
+    xc = np.fft.irfft(np.fft.rfft(a, size, axis=1) * np.conj(np.fft.rfft(b, size)), size, axis=1)
+
+    # circular correlation, lag k at xc[k], negative lags at the end
+    lags = np.arange(-max_shift, max_shift + 1)
+    xc = xc[:, lags % size]
+
+    # lag k overlap: capture [max(k, 0), length + min(k, 0)), reference shifted by -k
+    ca = np.zeros((n, length + 1))
+    np.cumsum(a * a, axis=1, out=ca[:, 1:])
+    cb = np.concatenate(([0.0], np.cumsum(b * b)))
+    pos = np.maximum(lags, 0)
+    neg = np.maximum(-lags, 0)
+    norm = np.sqrt((ca[:, length - neg] - ca[:, pos]) * (cb[length - pos] - cb[neg]))
+
+    ok = norm > 0
+    ncc = np.full(xc.shape, -np.inf)
+    np.divide(xc, norm, out=ncc, where=ok)
+    best = np.argmax(ncc, axis=1)
+
+    rows = np.arange(n)
+    ncc = np.where(ok[rows, best], ncc[rows, best], np.nan)
+    return lags[best], ncc
+
+
+# compare batch of captures to reference, captures aligned by cross-correlation,
+# 'tolerance' - max deviation in ADC codes, scalar or per sample array,
+# return dict of per capture summary arrays and 'deviation' (captures, samples),
+# NaN where aligned capture not overlap reference, ValueError if captures and
+# reference lengths differ
+def ns_compare(captures, ref, **kwargs):
+    tolerance = kwargs.get('tolerance', 8)
+    max_shift = kwargs.get('max_shift', 16)
+    min_ncc = kwargs.get('min_ncc', 0.9)
+
+    if isinstance(captures, np.ndarray):
+        y = np.atleast_2d(captures).astype(np.float64)
+    else:
+        y = ns_batch(captures)
+    ref = np.asarray(ref, dtype=np.float64)
+    n, length = y.shape
+    if ref.shape != (length,):
+        raise ValueError('capture length %d not match reference length %d' % (length, ref.size))
+
+    lag, ncc = ns_align(y, ref, max_shift)
+
+    # aligned capture sample index of each reference sample
+    ix = np.arange(length) + lag[:, None]
+    valid = (ix >= 0) & (ix < length)
+    aligned = np.take_along_axis(y, np.clip(ix, 0, length - 1), axis=1)
+
+    dev = np.where(valid, aligned - ref, np.nan)
+    absdev = np.abs(dev)
+    out = np.zeros(y.shape, dtype=bool)
+    np.greater(absdev, tolerance, out=out, where=valid)
+
+    count = valid.sum(axis=1)
+    res = {
+        'lag': lag,
+        'ncc': ncc,
+        'max_dev': np.nanmax(absdev, axis=1),
+        'mean_dev': np.nanmean(dev, axis=1),
+        'rms_dev': np.sqrt(np.nanmean(dev * dev, axis=1)),
+        'out': out.sum(axis=1),
+        'out_part': out.sum(axis=1) / count,
+        'deviation': dev,
+    }
+    res['passed'] = (res['out'] == 0) & (np.nan_to_num(ncc) >= min_ncc)
+    return res
+
+
+# golden reference captures library, one file per configuration key,
+# references loaded on first use and kept in LRU cache
+class NS_GoldenLibrary(object):
+    """ reference captures library """
+
+    def __init__(self, path, **kwargs):
+        """ constructor """
+        self.path = path
+        self.cache_size = kwargs.get('cache_size', 32)
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+        self.misses = 0
+
+    # reference dict { 'samples', 'tolerance' } of key or None if not exist
+    def get(self, key):
+        with self.lock:
+            ref = self.cache.get(key, None)
+            if ref is not None:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return ref
+
+        name = os.path.join(self.path, ns_key_name(key))
+        if not os.path.exists(name):
+            self.misses += 1
+            return None
+
+        with np.load(name) as f:
+            ref = { k: f[k] for k in f.files }
+        self.loads += 1
+
+        with self.lock:
+            self.cache[key] = ref
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return ref
+
+    # save reference capture of key, optional per sample tolerance
+    def save(self, key, samples, tolerance=None):
+        os.makedirs(self.path, exist_ok=True)
+        ref = { 'samples': np.frombuffer(bytes(samples), dtype=np.uint8) }
+        if tolerance is not None:
+            ref['tolerance'] = np.asarray(tolerance)
+        np.savez(os.path.join(self.path, ns_key_name(key)), **ref)
+
+        with self.lock:
+            self.cache.pop(key, None)
+
+    # compare captures to reference of key, None if no reference,
+    # reference per sample tolerance used if saved
+    def compare(self, key, captures, **kwargs):
+        ref = self.get(key)
+        if ref is None:
+            return None
+        if 'tolerance' in ref and 'tolerance' not in kwargs:
+            kwargs['tolerance'] = ref['tolerance']
+        return ns_compare(captures, ref['samples'], **kwargs)
+
+
+if __name__ == '__main__':
+
+    # benchmark, usage: python ns_golden.py [captures] [samples]
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    length = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    x = np.arange(length + 32)
+    wave = 128 + 80 * np.sin(2 * np.pi * x / 137.0) + 30 * np.sign(np.sin(2 * np.pi * x / 411.0))
+    ref = wave[16:16 + length]
+    shifts = np.random.randint(-10, 11, n)
+    y = np.stack([wave[16 + s:16 + s + length] for s in shifts]) + np.random.normal(0, 1, (n, length))
+
+    t = perf_counter()
+    res = ns_compare(y, ref, tolerance=6)
+    t = perf_counter() - t
+    print('%d captures x %d samples: %.2f ms, %.1f us per capture' % (n, length, t * 1000, t * 1e6 / n))
+    print('lags ok: %s, passed: %d, max dev %.2f' %
+          (np.array_equal(res['lag'], -shifts), res['passed'].sum(), np.nanmax(res['max_dev'])))
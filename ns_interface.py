@@ -1,7 +1,45 @@
 #!python3
 
+import threading
+from time import monotonic
 
-class NS_DriverInterface(object):
+
+# coalesced write of small frames, shared by all transports, transport may
+# override ' write_frames(frames) ' with scatter-gather write
+class NS_FrameQueue(object):
+    """ coalesced frames write """
+
+    tx_queue = None
+
+    # max bytes of one coalesced write, see ns_transport 'max_frame' capability
+    def set_max_frame(self, max_bytes):
+        self.frame_queue().max_bytes = max_bytes
+
+    def frame_queue(self):
+        if self.tx_queue is None:
+            self.tx_queue = NS_WriteCoalescer(self.write_frames)
+        return self.tx_queue
+
+    # enqueue frame to coalesced write, queued frames sent by send_queued() or by
+    # enqueue() if frame not fit, return send status of frames sent by it, 0 if only queued
+    def enqueue(self, buf):
+        return self.frame_queue().put(buf)
+
+    # send all queued frames, return send status
+    def send_queued(self):
+        return self.frame_queue().send()
+
+    # drop not sent frames, for example after enqueue error
+    def drop_queued(self):
+        self.frame_queue().clear()
+
+    # write several frames with one transport call, default - one joined write
+    def write_frames(self, frames):
+        buf = b''.join(frames)
+        return self.write(buf, len(buf))
+
+
+class NS_DriverInterface(NS_FrameQueue):
     """docstring for NS_DriverInterface"""
 
     respond_codes = {
@@ -29,6 +67,7 @@ class NS_DriverInterface(object):
         """ constructor """
         self.code = 0x00;
         self.lg = None
+        self.open_dev = 0
 
     def set_log(self, log):
         """ set log callback """
@@ -51,4 +90,69 @@ class NS_DriverInterface(object):
         return '(%s)' % self.respond_codes[code].lower()
 
     def set_ip_port(self, **kwargs):
-        pass
\ No newline at end of file
+        pass
+
+
+# write coalescing buffer, collects small frames and send them with one
+# transport call ' send(frames) ', where frames - list of bytes, queued frames
+# sent by send() or by next put() if new frame not fit to 'max_bytes' or first
+# queued frame older than 'max_age', no timer threads - frames not sent while
+# nothing put, send status always returned to caller of put() or send()
+class NS_WriteCoalescer(object):
+    """ write coalescing buffer """
+
+    def __init__(self, send, **kwargs):
+        """ constructor """
+        self.send_func = send
+        # max bytes of one send
+        self.max_bytes = kwargs.get('max_bytes', 512)
+        # max sec of first queued frame, checked by next put(), 0 - disabled
+        self.max_age = kwargs.get('max_age', 0.005)
+
+        self.frames = []
+        self.size = 0
+        self.first = 0.0
+        self.lock = threading.Lock()
+
+        # statistic
+        self.sends = 0
+        self.frames_sent = 0
+
+    def put(self, buf):
+        with self.lock:
+            st = 0
+            if self.frames and (self.size + len(buf) > self.max_bytes or
+                                (self.max_age and monotonic() - self.first > self.max_age)):
+                st = self._send()
+
+            if not self.frames:
+                self.first = monotonic()
+            self.frames.append(bytes(buf))
+            self.size += len(buf)
+            return st
+
+    def send(self):
+        with self.lock:
+            return self._send()
+
+    # drop queued frames without send
+    def clear(self):
+        with self.lock:
+            self.frames = []
+            self.size = 0
+
+    def pending(self):
+        return self.size
+
+    # lock must be held
+    def _send(self):
+        if not self.frames:
+            return 0
+
+        frames = self.frames
+        self.frames = []
+        self.size = 0
+
+        self.sends += 1
+        self.frames_sent += len(frames)
+        return self.send_func(frames)
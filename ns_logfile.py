@@ -0,0 +1,116 @@
+#!python3
+
+import os
+import threading
+from queue import Queue, Empty
+from datetime import datetime
+from time import monotonic
+
+
+# background log file writer, log records appended to per-run file as they
+# produced, file rotated to next part when size limit reached
+class NS_LogWriter(object):
+    """ background log file writer """
+
+    def __init__(self, **kwargs):
+        """ constructor """
+        self.log_dir = kwargs.get('log_dir', 'logs')
+        self.max_bytes = kwargs.get('max_bytes', 4 << 20)
+        self.fsync_interval = kwargs.get('fsync_interval', 1.0)
+        self.buffering = kwargs.get('buffering', 1 << 16)
+
+        self.queue = Queue()
+        self.file = None
+        self.run_name = None
+        self.part = 0
+        self.size = 0
+        self.dirty = False
+        self.last_sync = monotonic()
+
+        self.thread = threading.Thread(target=self.worker)
+        self.thread.daemon = True
+        self.thread.start()
+
+    # start new run log file, name generated from date/time if not provided,
+    # milliseconds in name keep queued runs in separate files
+    def start_run(self, name=None):
+        if name is None:
+            name = datetime.now().strftime('ns_test_%Y%m%d_%H%M%S_%f')[:-3]
+        self.queue.put(('start', name))
+
+    # close run log file
+    def end_run(self):
+        self.queue.put(('end', None))
+
+    # log record, may be called from any thread, must be of the form: ' def nlg(msg, lvl) '
+    def write(self, msg, lvl=''):
+        self.queue.put(('rec', '%s [%s] %s\n' % (str(datetime.utcnow()).split()[1], lvl or '-', msg.rstrip('\r\n'))))
+
+    # stop writer thread, wait for all records written
+    def close(self):
+        self.queue.put(('stop', None))
+        self.thread.join()
+
+    def path(self):
+        if self.part:
+            return os.path.join(self.log_dir, '%s.%d.txt' % (self.run_name, self.part))
+        return os.path.join(self.log_dir, '%s.txt' % self.run_name)
+
+    def worker(self):
+        while True:
+            try:
+                cmd, data = self.queue.get(timeout=self.fsync_interval)
+            except Empty:
+                self.sync()
+                continue
+
+            if cmd == 'rec':
+                self.append(data)
+            elif cmd == 'start':
+                self.close_file()
+                self.run_name = data
+                self.part = 0
+                self.open_file()
+            elif cmd == 'end':
+                self.close_file()
+                self.run_name = None
+            elif cmd == 'stop':
+                self.close_file()
+                return
+
+            if monotonic() - self.last_sync > self.fsync_interval:
+                self.sync()
+
+    def append(self, rec):
+        # records out of run are not saved
+        if self.file is None:
+            return
+
+        if self.size >= self.max_bytes:
+            self.close_file()
+            self.part += 1
+            self.open_file()
+
+        data = rec.encode('utf-8', errors='replace')
+        self.file.write(data)
+        self.size += len(data)
+        self.dirty = True
+
+    def open_file(self):
+        os.makedirs(self.log_dir, exist_ok=True)
+        self.file = open(self.path(), 'ab', buffering=self.buffering)
+        self.size = self.file.tell()
+
+    def close_file(self):
+        if self.file is not None:
+            self.sync()
+            self.file.close()
+            self.file = None
+
+    # flush buffered records and fsync
+    def sync(self):
+        self.last_sync = monotonic()
+        if self.file is not None and self.dirty:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.dirty = False
@@ -0,0 +1,199 @@
+#!python3
+
+import sys
+import numpy as np
+from time import perf_counter
+
+
+# measurement names, all values per capture, NaN if can't be measured
+ns_measurements = ['mean', 'rms', 'min', 'max', 'p2p', 'freq', 'period', 'duty', 'rise', 'fall']
+
+
+# captures list of bytes/arrays with same length to 2D float array (captures, samples)
+def ns_batch(captures):
+    rows = [np.frombuffer(c, dtype=np.uint8) if isinstance(c, (bytes, bytearray, memoryview))
+            else np.asarray(c) for c in captures]
+    return np.stack(rows).astype(np.float64)
+
+
+# interpolated level crossings of all captures in batch, 'level' - per capture,
+# return (capture indexes, crossing positions in samples) sorted by capture and position
+def ns_crossings(y, level, rising=True):
+    lvl = level[:, None]
+    y0 = y[:, :-1]
+    y1 = y[:, 1:]
+    if rising:
+        mask = (y0 < lvl) & (y1 >= lvl)
+    else:
+        mask = (y0 > lvl) & (y1 <= lvl)
+
+    rows, cols = np.nonzero(mask)
+    a = y0[rows, cols]
+    b = y1[rows, cols]
+    return rows, cols + (level[rows] - a) / (b - a)
+
+
+# level crossings with hysteresis, crossing counted only when signal passed from below
+# 'lo' to above 'hi' (rising) or back (falling), noise around 'level' ignored
+def ns_edges(y, level, lo, hi, rising=True):
+    n, length = y.shape
+    state = (y > hi[:, None]).astype(np.int8) - (y < lo[:, None])
+
+    # forward fill last known state
+    ix = np.where(state != 0, np.arange(length), 0)
+    np.maximum.accumulate(ix, axis=1, out=ix)
+    state = np.take_along_axis(state, ix, axis=1)
+
+    if rising:
+        rows, k = np.nonzero((state[:, :-1] == -1) & (state[:, 1:] == 1))
+    else:
+        rows, k = np.nonzero((state[:, :-1] == 1) & (state[:, 1:] == -1))
+
+    # last 'level' crossing before hysteresis state switch
+    rc, tc = ns_crossings(y, level, rising)
+    j = np.searchsorted(rc * length + tc, rows * length + k + 1) - 1
+    return rows, tc[j]
+
+
+# mean transition time per capture from crossings of level 'a' to next crossing of level 'b',
+# transition counted only if no other 'a' crossing between
+def ns_transition(rows_a, t_a, rows_b, t_b, n, length):
+    out = np.full(n, np.nan)
+    if not len(t_a) or not len(t_b):
+        return out
+
+    # global positions, captures placed one after another
+    ga = rows_a * length + t_a
+    gb = rows_b * length + t_b
+    j = np.searchsorted(gb, ga)
+    ok = j < len(gb)
+    j = np.minimum(j, len(gb) - 1)
+
+    ok &= rows_b[j] == rows_a
+    nxt = np.append(ga[1:], np.inf)
+    ok &= gb[j] < nxt
+
+    dt = gb[j] - ga
+    cnt = np.bincount(rows_a[ok], minlength=n)
+    tot = np.bincount(rows_a[ok], weights=dt[ok], minlength=n)
+    has = cnt > 0
+    out[has] = tot[has] / cnt[has]
+    return out
+
+
+# measure batch of captures in one pass, 'dt' - sample period (sec),
+# 'zero' - ADC code of 0V, 'scale' - volts per ADC code, 'hysteresis' - part of p2p,
+# return dict of measurement name -> array of values per capture
+def ns_measure(captures, **kwargs):
+    dt = kwargs.get('dt', 1.0)
+    zero = kwargs.get('zero', 128)
+    scale = kwargs.get('scale', 1.0)
+    # hysteresis of edge detection, part of peak-to-peak
+    hyst = kwargs.get('hysteresis', 0.1)
+
+    # 2D array batch (captures, samples) of any dtype, uint8 must not wrap in arithmetic
+    if isinstance(captures, np.ndarray) and captures.ndim == 2:
+        y = captures.astype(np.float64, copy=False)
+    else:
+        y = ns_batch(captures)
+    n, length = y.shape
+
+    lo = y.min(axis=1)
+    hi = y.max(axis=1)
+    amp = hi - lo
+    mid = lo + amp * 0.5
+
+    res = {}
+    res['mean'] = (y.mean(axis=1) - zero) * scale
+    res['rms'] = np.sqrt(np.mean(np.square(y - zero), axis=1)) * scale
+    res['min'] = (lo - zero) * scale
+    res['max'] = (hi - zero) * scale
+    res['p2p'] = amp * scale
+
+    # period by rising mid level crossings, averaged over all whole periods
+    rows, t = ns_edges(y, mid, mid - amp * hyst, mid + amp * hyst, True)
+    cnt = np.bincount(rows, minlength=n)
+    first_ix = np.cumsum(cnt) - cnt
+    has = cnt > 1
+    first = np.full(n, np.nan)
+    last = np.full(n, np.nan)
+    first[has] = t[first_ix[has]]
+    last[has] = t[first_ix[has] + cnt[has] - 1]
+
+    period = np.full(n, np.nan)
+    period[has] = (last[has] - first[has]) / (cnt[has] - 1)
+    res['period'] = period * dt
+    res['freq'] = 1.0 / res['period']
+
+    # duty - high level samples part in whole periods
+    high = np.cumsum(y > mid[:, None], axis=1)
+    duty = np.full(n, np.nan)
+    rh = np.nonzero(has)[0]
+    a = np.ceil(first[rh]).astype(np.intp)
+    b = np.ceil(last[rh]).astype(np.intp)
+    duty[rh] = (high[rh, b - 1] - high[rh, a - 1]) / (b - a)
+    res['duty'] = duty
+
+    # rise 10% -> 90%, fall 90% -> 10%
+    l10 = lo + amp * 0.1
+    l90 = lo + amp * 0.9
+    r10, t10 = ns_crossings(y, l10, True)
+    r90, t90 = ns_crossings(y, l90, True)
+    res['rise'] = ns_transition(r10, t10, r90, t90, n, length) * dt
+    f90, t90 = ns_crossings(y, l90, False)
+    f10, t10 = ns_crossings(y, l10, False)
+    res['fall'] = ns_transition(f90, t90, f10, t10, n, length) * dt
+
+    # flat captures have no edges
+    for name in ('period', 'freq', 'duty', 'rise', 'fall'):
+        res[name][amp == 0] = np.nan
+    return res
+
+
+# check measurements against limits { name: (min or None, max or None), ... },
+# NaN value fails, return (pass array, list of failed names per capture)
+def ns_check_limits(results, limits):
+    n = len(next(iter(results.values())))
+    passed = np.ones(n, dtype=bool)
+    failed = [[] for j in range(n)]
+
+    for name, (lo, hi) in limits.items():
+        v = results[name]
+        ok = ~np.isnan(v)
+        if lo is not None:
+            ok &= v >= lo
+        if hi is not None:
+            ok &= v <= hi
+        passed &= ok
+        for j in np.nonzero(~ok)[0]:
+            failed[j].append(name)
+
+    return passed, failed
+
+
+# measure and check batch of captures (for example same step of all units of
+# fleet run) in one pass, return (pass array, failed names lists, results)
+def ns_check_batch(captures, limits, **kwargs):
+    results = ns_measure(captures, **kwargs)
+    passed, failed = ns_check_limits(results, limits)
+    return passed, failed, results
+
+
+if __name__ == '__main__':
+
+    # benchmark, usage: python ns_measure.py [captures] [samples]
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    length = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    x = np.arange(length)
+    periods = np.random.uniform(20, 200, n)[:, None]
+    y = 128 + 100 * np.sin(2 * np.pi * x / periods) + np.random.normal(0, 1, (n, length))
+    y = np.clip(y, 0, 255).astype(np.uint8).astype(np.float64)
+
+    t = perf_counter()
+    res = ns_measure(y)
+    t = perf_counter() - t
+    print('%d captures x %d samples: %.2f ms, %.2f us per capture' % (n, length, t * 1000, t * 1e6 / n))
+
+    err = np.nanmax(np.abs(res['period'] - periods[:, 0]) / periods[:, 0])
+    print('max period error: %.3f%%, duty mean %.3f' % (err * 100, np.nanmean(res['duty'])))
@@ -0,0 +1,129 @@
+#!python3
+
+import threading
+from time import monotonic
+
+
+# keep-alive pool of opened and 'connect' handshaked device sessions,
+# sessions are keyed by (ip, port), idle sessions closed by reaper thread
+# after 'idle_timeout'
+class NS_ConnectionPool(object):
+    """ pool of idle device sessions """
+
+    def __init__(self, **kwargs):
+        """ constructor """
+        # max idle time in sec before session will be closed
+        self.idle_timeout = kwargs.get('idle_timeout', 60.0)
+        # max idle sessions for one (ip, port) key
+        self.max_idle = kwargs.get('max_idle', 1)
+        # session close func of the form: ' def close(interface) ', for example
+        # ns_commander.ns_session_close to send 'disconnect' before close
+        self.close_func = kwargs.get('close', None)
+
+        # (ip, port): [ [interface, mcu fw ver, release time], ... ]
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.reaper = None
+        self.reaper_stop = threading.Event()
+
+    # get idle session for key, 'check' - health check func of the form:
+    # ' def check(interface) ', return 0 if session alive
+    def acquire(self, key, check=None):
+        while True:
+            self.purge()
+            with self.lock:
+                idle = self.sessions.get(key, [])
+                if not idle:
+                    return None
+                entry = idle.pop()
+
+            try:
+                alive = check is None or not check(entry[0])
+            except Exception:
+                alive = False
+            if alive:
+                return entry[:2]
+
+            # session not respond or dropped by peer - evict
+            self._close(entry, False)
+
+    # return session to pool, return True if session is kept
+    def release(self, key, interface, fw_ver=0.0):
+        self.purge()
+        with self.lock:
+            idle = self.sessions.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append([interface, fw_ver, monotonic()])
+                self.start_reaper()
+                return True
+        return False
+
+    # close and remove all sessions for key
+    def evict(self, key):
+        with self.lock:
+            idle = self.sessions.pop(key, [])
+        for entry in idle:
+            self._close(entry)
+
+    # close and remove all sessions, reaper stopped
+    def clear(self):
+        self.stop_reaper()
+        with self.lock:
+            keys = list(self.sessions.keys())
+        for key in keys:
+            self.evict(key)
+
+    def idle_count(self, key=None):
+        with self.lock:
+            if key is not None:
+                return len(self.sessions.get(key, []))
+            return sum(len(s) for s in self.sessions.values())
+
+    # close and remove sessions idle more than 'idle_timeout'
+    def purge(self):
+        now = monotonic()
+        expired = []
+        with self.lock:
+            for key in list(self.sessions.keys()):
+                idle = self.sessions[key]
+                expired += [e for e in idle if now - e[2] > self.idle_timeout]
+                idle[:] = [e for e in idle if now - e[2] <= self.idle_timeout]
+                if not idle:
+                    del self.sessions[key]
+        for entry in expired:
+            self._close(entry)
+
+    # background purge of idle sessions, lock must be held
+    def start_reaper(self):
+        if self.reaper is not None and self.reaper.is_alive():
+            return
+        self.reaper_stop.clear()
+        self.reaper = threading.Thread(target=self.reaper_loop)
+        self.reaper.daemon = True
+        self.reaper.start()
+
+    def stop_reaper(self):
+        self.reaper_stop.set()
+        reaper = self.reaper
+        if reaper is not None and reaper is not threading.current_thread():
+            reaper.join()
+        self.reaper = None
+
+    def reaper_loop(self):
+        period = max(min(self.idle_timeout / 4, 10.0), 0.05)
+        while not self.reaper_stop.wait(period):
+            self.purge()
+            with self.lock:
+                if not self.sessions:
+                    self.reaper = None
+                    return
+
+    # close session, 'close_func' used for alive session, dead session only closed
+    def _close(self, entry, alive=True):
+        try:
+            if alive and self.close_func is not None:
+                self.close_func(entry[0])
+            else:
+                entry[0].close()
+        except Exception:
+            pass
@@ -0,0 +1,85 @@
+#!python3
+
+import threading
+
+
+# fixed size bytearray ring buffer, one producer (reader thread) and
+# consumers wait on condition for requested number of bytes
+class NS_RingBuffer(object):
+    """ bytes ring buffer """
+
+    def __init__(self, size=65536):
+        """ constructor """
+        self.size = size
+        self.buf = bytearray(size)
+        self.head = 0       # write position
+        self.count = 0      # bytes stored
+        self.overflow = 0   # dropped bytes counter
+        self.closed = False
+        self.cond = threading.Condition()
+
+    # write data, on overflow oldest bytes are dropped and counted
+    def write(self, data):
+        n = len(data)
+        if not n:
+            return 0
+
+        with self.cond:
+            if n > self.size:
+                self.overflow += n - self.size
+                data = data[n - self.size:]
+                n = self.size
+
+            free = self.size - self.count
+            if n > free:
+                self.overflow += n - free
+                self.count -= n - free
+
+            first = min(n, self.size - self.head)
+            self.buf[self.head:self.head + first] = data[:first]
+            if first < n:
+                self.buf[:n - first] = data[first:]
+
+            self.head = (self.head + n) % self.size
+            self.count += n
+            self.cond.notify_all()
+        return n
+
+    # wait until 'nb' bytes available or timeout (sec), return up to 'nb' bytes
+    def read(self, nb, timeout=None):
+        with self.cond:
+            self.cond.wait_for(lambda: self.count >= nb or self.closed, timeout)
+            return self._take(nb)
+
+    # wait until any bytes available or timeout (sec), return up to 'nb' bytes
+    def read_some(self, nb, timeout=None):
+        with self.cond:
+            self.cond.wait_for(lambda: self.count or self.closed, timeout)
+            return self._take(nb)
+
+    # lock must be held
+    def _take(self, nb):
+        n = min(nb, self.count)
+        tail = (self.head - self.count) % self.size
+        first = min(n, self.size - tail)
+
+        data = bytes(self.buf[tail:tail + first])
+        if first < n:
+            data += self.buf[:n - first]
+
+        self.count -= n
+        return data
+
+    def available(self):
+        with self.cond:
+            return self.count
+
+    def clear(self):
+        with self.cond:
+            self.count = 0
+
+    # wake up all waiting consumers, no more data will be written
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
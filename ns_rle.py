@@ -0,0 +1,148 @@
+#!python3
+
+import sys
+import numpy as np
+from time import perf_counter
+
+
+# logic analyzer 'la RLE' capture decoder, capture is (state, run) byte pairs,
+# state - 8 LA channels, run - repeats count minus 'run_offset'.
+# data fed by chunks as received, odd byte kept to next chunk, equal neighbour
+# states merged so memory bounded by states changes count, not capture length
+class NS_RLEDecoder(object):
+    """ LA run-length decoder """
+
+    def __init__(self, **kwargs):
+        """ constructor """
+        self.run_offset = kwargs.get('run_offset', 1)
+        self.merge = kwargs.get('merge', True)
+        self.clear()
+
+    def clear(self):
+        self.carry = b''
+        self.value_parts = []
+        self.run_parts = []
+        self.total = 0
+        self._ends = None
+
+    # decoded samples count
+    def __len__(self):
+        return self.total
+
+    # decode next chunk of RLE bytes
+    def feed(self, chunk):
+        if self.carry:
+            chunk = self.carry + bytes(chunk)
+        a = np.frombuffer(chunk, dtype=np.uint8)
+        n = len(a) & ~1
+        self.carry = bytes(a[n:])
+        if not n:
+            return
+
+        v = a[0:n:2]
+        r = a[1:n:2].astype(np.int64) + self.run_offset
+
+        if self.merge:
+            starts = np.flatnonzero(np.concatenate(([True], v[1:] != v[:-1])))
+            r = np.add.reduceat(r, starts)
+            v = v[starts]
+
+            # first run continue last run of previous chunk
+            if self.value_parts and self.value_parts[-1][-1] == v[0]:
+                self.run_parts[-1][-1] += r[0]
+                self.total += int(r[0])
+                v, r = v[1:], r[1:]
+        else:
+            v = v.copy()
+
+        if len(v):
+            self.value_parts.append(v)
+            self.run_parts.append(r)
+            self.total += int(r.sum())
+        self._ends = None
+
+    # callback for NS3_Commander.get_data 'on_chunk', only bytes of
+    # respond [offset, offset + length) fed to decoder
+    def on_chunk(self, offset, length):
+        end = offset + length
+
+        def chunk_cb(got, chunk):
+            pos = got - len(chunk)
+            a = max(offset, pos)
+            b = min(end, got)
+            if b > a:
+                self.feed(chunk[a - pos:b - pos])
+        return chunk_cb
+
+    def compact(self):
+        if len(self.value_parts) > 1:
+            self.value_parts = [np.concatenate(self.value_parts)]
+            self.run_parts = [np.concatenate(self.run_parts)]
+
+    # compact (states, runs) arrays
+    def values(self):
+        self.compact()
+        return self.value_parts[0] if self.value_parts else np.empty(0, np.uint8)
+
+    def runs(self):
+        self.compact()
+        return self.run_parts[0] if self.run_parts else np.empty(0, np.int64)
+
+    # end sample index (exclusive) of each run
+    def ends(self):
+        if self._ends is None:
+            self._ends = np.cumsum(self.runs())
+        return self._ends
+
+    # states at sample indexes, without expansion
+    def at(self, indexes):
+        return self.values()[np.searchsorted(self.ends(), indexes, side='right')]
+
+    # expanded 8 bit samples of window [start, stop) only
+    def expand(self, start=0, stop=None):
+        stop = self.total if stop is None else min(stop, self.total)
+        start = max(0, start)
+        if stop <= start:
+            return np.empty(0, np.uint8)
+
+        ends = self.ends()
+        i0 = int(np.searchsorted(ends, start, side='right'))
+        i1 = int(np.searchsorted(ends, stop, side='left')) + 1
+
+        r = self.runs()[i0:i1].copy()
+        r[0] -= start - (ends[i0] - self.runs()[i0])
+        r[-1] -= ends[i1 - 1] - stop
+        return np.repeat(self.values()[i0:i1], r)
+
+    # expanded samples by windows of 'size', yield (start, samples)
+    def windows(self, size, start=0, stop=None):
+        stop = self.total if stop is None else min(stop, self.total)
+        for a in range(start, stop, size):
+            yield a, self.expand(a, min(a + size, stop))
+
+
+if __name__ == '__main__':
+
+    # benchmark, usage: python ns_rle.py [pairs] [chunk]
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1 << 20
+    chunk = int(sys.argv[2]) if len(sys.argv) > 2 else 4096
+
+    pairs = np.empty(2 * n, np.uint8)
+    pairs[0::2] = np.random.randint(0, 4, n)
+    pairs[1::2] = np.random.randint(0, 256, n)
+    raw = bytes(pairs)
+
+    dec = NS_RLEDecoder()
+    t = perf_counter()
+    for j in range(0, len(raw), chunk):
+        dec.feed(raw[j:j + chunk])
+    t = perf_counter() - t
+    print('decode %d bytes by %d: %.2f ms, %d samples in %d runs (%d bytes)' %
+          (len(raw), chunk, t * 1000, len(dec), len(dec.values()), dec.values().nbytes + dec.runs().nbytes))
+
+    t = perf_counter()
+    w = dec.expand(len(dec) // 2, len(dec) // 2 + 100000)
+    print('expand window %d samples: %.3f ms' % (len(w), (perf_counter() - t) * 1000))
+
+    full = np.repeat(pairs[0::2], pairs[1::2].astype(np.int64) + 1)
+    print('window matches full expansion:', np.array_equal(w, full[len(dec) // 2:len(dec) // 2 + 100000]))
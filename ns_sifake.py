@@ -0,0 +1,162 @@
+#!python3
+
+import sys
+from time import perf_counter
+from crc8 import ns_crc_buf
+
+
+# make device respond for command frame [0x5B, cmd, len, data..., crc]
+def ns_fake_respond(frame, batt=87, fw_ver=31):
+    cmd = frame[1]
+
+    if cmd == 0x30:
+        # get data, respond len = requested bytes + 9
+        num = (frame[3] << 10) | (frame[4] << 2) | (frame[5] >> 6)
+        body = [0x70] + [(j * 7) & 0xFF for j in range(num + 6)]
+    elif cmd == 0xA0:
+        body = [0xE0, 0x01, batt]
+    elif cmd == 0x00:
+        body = [0x40, 0x01, fw_ver]
+    else:
+        body = [(cmd + 0x40) & 0xFF] + list(frame[2:-1])
+
+    rs = [0x5B] + body
+    rs.append(ns_crc_buf(rs))
+    return rs
+
+
+# fake USBXpress dll, emulate SiUSBxp.dll functions and connected NeilScope devices,
+# used as 'si_dll' argument of NS_SiUSBXp for work without real device and windows
+class NS_FakeSiDll(object):
+    """ fake SiUSBxp.dll binding """
+
+    # SI_GetProductString options
+    product_options = {
+        0x00: 'serial',
+        0x01: 'desc',
+        0x02: 'link',
+        0x03: 'vid',
+        0x04: 'pid',
+    }
+
+    def __init__(self, **kwargs):
+        """ constructor """
+        self.devices = kwargs.get('devices', [
+            { 'serial': 'NS3-0001', 'desc': 'NeilScope3', 'link': '', 'vid': '10C4', 'pid': '8693' }
+        ])
+        self.rx = bytearray()
+        self.opened = None
+        self.read_timeout = 1000
+        self.write_timeout = 1000
+        self.calls = {}
+
+    def call(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def SI_GetNumDevices(self, num_dev):
+        self.call('SI_GetNumDevices')
+        num_dev._obj.value = len(self.devices)
+        return 0x00
+
+    def SI_GetProductString(self, dev_num, s, options):
+        self.call('SI_GetProductString')
+        dev_num = getattr(dev_num, 'value', dev_num)
+        if dev_num >= len(self.devices):
+            return 0xFF
+        s.value = self.devices[dev_num][self.product_options[options]].encode()
+        return 0x00
+
+    def SI_Open(self, dev_num, handle):
+        self.call('SI_Open')
+        if dev_num.value >= len(self.devices):
+            return 0xFF
+        self.opened = dev_num.value
+        handle._obj.value = dev_num.value + 1
+        return 0x00
+
+    def SI_Close(self, handle):
+        self.call('SI_Close')
+        self.opened = None
+        return 0x00
+
+    def SI_FlushBuffers(self, handle, tx, rx):
+        self.call('SI_FlushBuffers')
+        if rx.value:
+            self.rx[:] = b''
+        return 0x00
+
+    def SI_CheckRXQueue(self, handle, qbytes, qstatus):
+        self.call('SI_CheckRXQueue')
+        qbytes._obj.value = len(self.rx)
+        # SI_RX_READY or SI_RX_EMPTY
+        qstatus._obj.value = 0x04 if self.rx else 0x01
+        return 0x00
+
+    def SI_Read(self, handle, buf, nb, rb, overlapped):
+        self.call('SI_Read')
+        n = min(nb.value, len(self.rx))
+        buf = buf._obj
+        buf[:n] = self.rx[:n]
+        del self.rx[:n]
+        rb._obj.value = n
+        # SI_READ_TIMED_OUT if not all requested bytes received
+        return 0x00 if n == nb.value else 0x0d
+
+    def SI_Write(self, handle, buf, nb, wb, overlapped):
+        self.call('SI_Write')
+        data = bytes(buf._obj)[:nb.value]
+        # parse all frames in written data, append responds to rx queue
+        j = 0
+        while j < len(data):
+            if data[j] != 0x5B or j + 2 >= len(data):
+                j += 1
+                continue
+            end = j + 4 + data[j + 2]
+            self.rx += bytes(ns_fake_respond(list(data[j:end])))
+            j = end
+        wb._obj.value = nb.value
+        return 0x00
+
+    def SI_SetBaudRate(self, handle, br):
+        self.call('SI_SetBaudRate')
+        return 0x00
+
+    def SI_SetTimeouts(self, rt, wt):
+        self.call('SI_SetTimeouts')
+        self.read_timeout, self.write_timeout = rt.value, wt.value
+        return 0x00
+
+    def SI_GetTimeouts(self, rt, wt):
+        self.call('SI_GetTimeouts')
+        rt._obj.value, wt._obj.value = self.read_timeout, self.write_timeout
+        return 0x00
+
+
+if __name__ == '__main__':
+
+    # benchmark NS_SiUSBXp read over fake dll, usage: python ns_sifake.py [bytes] [count]
+    from ns_siusbxp import NS_SiUSBXp
+
+    nb = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    dll = NS_FakeSiDll()
+    si = NS_SiUSBXp(si_dll=dll)
+    si.open(0)
+
+    payload = bytes((j * 7) & 0xFF for j in range(nb))
+    frame = [0x5B, 0x25, 0x01, 0x00, 0x00]
+    rd = []
+
+    start = perf_counter()
+    for j in range(count):
+        dll.rx[:] = payload
+        si.read(rd, nb)
+    t = perf_counter() - start
+    print('read %d bytes: %.1f us per call' % (nb, t / count * 1e6))
+
+    start = perf_counter()
+    for j in range(count):
+        si.write(frame, len(frame))
+    t = perf_counter() - start
+    print('write %d bytes: %.1f us per call' % (len(frame), t / count * 1e6))
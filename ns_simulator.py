@@ -0,0 +1,139 @@
+#!python3
+
+# telnet-attached NeilScope simulator, answers device commands on TCP endpoint,
+# used for dry run and tests of telnet interface, pool and discovery on
+# loopback addresses 127.0.0.x
+#
+# usage: python ns_simulator.py [ip] [port] [respond delay ms]
+
+import sys
+import socket
+import threading
+from time import sleep
+from ns_sifake import ns_fake_respond
+
+
+# telnet 'Interpret As Command' byte, doubled in received commands,
+# responds sent raw same as device (NS_Telnet read raw data)
+IAC = b'\xff'
+
+
+class NS_TelnetSimulator(object):
+    """ telnet NeilScope simulator """
+
+    def __init__(self, ip='127.0.0.1', port=0, **kwargs):
+        """ constructor """
+        # delay before each respond, sec
+        self.delay = kwargs.get('delay', 0.0)
+        self.batt = kwargs.get('batt', 87)
+        self.fw_ver = kwargs.get('fw_ver', 31)
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((ip, port))
+        self.sock.listen(8)
+        self.ip, self.port = self.sock.getsockname()
+
+        self.running = False
+        self.lock = threading.Lock()
+        self.clients = []
+        # statistic: accepted connections and received command codes
+        self.connections = 0
+        self.cmds = []
+
+    def start(self):
+        self.running = True
+        th = threading.Thread(target=self.accept_loop)
+        th.daemon = True
+        th.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        self.sock.close()
+        with self.lock:
+            clients = self.clients
+            self.clients = []
+        for c in clients:
+            self.close_client(c)
+
+    # drop all connections, for example to emulate device power off
+    def drop(self):
+        with self.lock:
+            clients = self.clients
+            self.clients = []
+        for c in clients:
+            self.close_client(c)
+
+    def close_client(self, c):
+        try:
+            c.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        c.close()
+
+    def accept_loop(self):
+        while self.running:
+            try:
+                c, addr = self.sock.accept()
+            except OSError:
+                return
+            with self.lock:
+                self.connections += 1
+                self.clients.append(c)
+            th = threading.Thread(target=self.client_loop, args=(c,))
+            th.daemon = True
+            th.start()
+
+    def client_loop(self, c):
+        buf = b''
+        # lone IAC at end of received chunk, pair of it in next chunk
+        iac = b''
+        while True:
+            try:
+                a = c.recv(4096)
+            except OSError:
+                return
+            if not a:
+                return
+
+            # un-double only received bytes, buffered bytes already un-doubled
+            a = iac + a
+            iac = b''
+            if (len(a) - len(a.rstrip(IAC))) & 1:
+                a, iac = a[:-1], IAC
+            buf += a.replace(IAC + IAC, IAC)
+            while len(buf) >= 3:
+                if buf[0] != 0x5B:
+                    buf = buf[1:]
+                    continue
+                end = 4 + buf[2]
+                if len(buf) < end:
+                    break
+                frame = list(buf[:end])
+                buf = buf[end:]
+
+                with self.lock:
+                    self.cmds.append(frame[1])
+                if self.delay:
+                    sleep(self.delay)
+                rs = bytes(ns_fake_respond(frame, self.batt, self.fw_ver))
+                try:
+                    c.sendall(rs)
+                except OSError:
+                    return
+
+
+if __name__ == '__main__':
+
+    ip = sys.argv[1] if len(sys.argv) > 1 else '127.0.0.1'
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 2323
+    delay = float(sys.argv[3]) / 1000 if len(sys.argv) > 3 else 0.0
+
+    sim = NS_TelnetSimulator(ip, port, delay=delay).start()
+    print('NeilScope simulator on %s:%d, Ctrl+C to stop' % (sim.ip, sim.port))
+    try:
+        while True:
+            sleep(1)
+    except KeyboardInterrupt:
+        sim.stop()
@@ -1,11 +1,14 @@
 #!python3
 
+import threading
+from time import monotonic, sleep
 from ctypes import *
 from ctypes.wintypes import *
+from ns_interface import NS_FrameQueue
 
 
 # main USBXpress class
-class NS_SiUSBXp(object):
+class NS_SiUSBXp(NS_FrameQueue):
 
     respond_codes = {
         0x00:"SI_SUCCESS",
@@ -27,17 +30,52 @@ class NS_SiUSBXp(object):
         0x0f:"SI_IO_PENDING"
     }
 
+    # SI_GetProductString options
+    product_options = {
+        'serial': 0x00,
+        'desc': 0x01,
+        'vid': 0x03,
+        'pid': 0x04,
+    }
+
+    # attached devices index for each dll binding, cached until rescan
+    dev_index = {}
+    # serials of devices opened in this process
+    dev_claimed = set()
+    dev_lock = threading.Lock()
+
     def __init__(self, **kwargs):
-        # constructor
-        self.si_dll = windll.SiUSBxp
+        # constructor, 'si_dll' - optional USBXpress dll binding, for example fake dll object
+        # real dll loaded on first call
+        self._si_dll = kwargs.get('si_dll', None)
         self.handle = HANDLE()
         self.num_dev = 0
         self.open_dev = 0
         self.si_code = 0xFF;
         self.lg = None
 
+        # reusable read/write ctypes buffers, grown on demand
+        self.rx_buf = (c_ubyte * 0)()
+        self.tx_buf = (c_ubyte * 0)()
+        self.rx_view = memoryview(b'')
+
+        self.read_timeout = 1000
+        self.write_timeout = 1000
+
+        # device to open by serial or index, first not claimed NeilScope if not set
+        self.dev_serial = kwargs.get('serial', None)
+        self.dev_num = kwargs.get('dev_num', None)
+        self.claimed = None
+
     def xplg(msg, err): pass
 
+    # USBXpress dll binding, SiUSBxp.dll loaded on first use
+    @property
+    def si_dll(self):
+        if self._si_dll is None:
+            self._si_dll = windll.SiUSBxp
+        return self._si_dll
+
     # set log callback, log func must be of the form: ' def nlg(msg, level) '
     def set_log(self, log):
         self.lg = log
@@ -60,17 +98,75 @@ class NS_SiUSBXp(object):
 
     def connect(self):
         status = 0xFF
-        # get num connected usbxpress devices, verify descr dev string
-        if self.get_num_dev() and 'NeilScope' in self.get_desc_str(0):
-            # try open
-            status = self.open(0)
-
-        self.log(self.get_num_dev())
-        self.log(self.get_desc_str(0))
-        self.log(status)
-
+        # find and claim device in attached devices index, try open,
+        # claim released and next device tried if open fail
+        tried = set()
+        while True:
+            dev = self.claim_dev(tried)
+            if dev is None:
+                break
+            status = self.open(dev['index'])
+            if not status:
+                break
+            self.unclaim()
+            tried.add(dev['serial'])
+            if self.dev_serial is not None or self.dev_num is not None:
+                break
+
+        self.log('connect dev: %s' % (dev,))
         return status
 
+    # build index of all attached devices in one sweep, cached until rescan
+    def enumerate(self, rescan = False):
+        dll = self.si_dll
+        with NS_SiUSBXp.dev_lock:
+            index = NS_SiUSBXp.dev_index.get(dll, None)
+            if index is not None and not rescan:
+                return index
+
+            index = []
+            for j in range(self.get_num_dev()):
+                dev = { 'index': j }
+                for name, opt in NS_SiUSBXp.product_options.items():
+                    s = create_string_buffer(128)
+                    self.si_code = dll.SI_GetProductString(j, s, opt)
+                    dev[name] = s.value.decode(errors='replace')
+                dev['vid'] = int(dev['vid'] or '0', 16)
+                dev['pid'] = int(dev['pid'] or '0', 16)
+                index.append(dev)
+
+            NS_SiUSBXp.dev_index[dll] = index
+            self.log('enumerate: %d devices' % len(index))
+            return index
+
+    # find device by serial or index, or first not claimed NeilScope device,
+    # device checked and claimed in one step, parallel workers claim distinct devices,
+    # 'skip' - serials not selected, return device dict or None
+    def claim_dev(self, skip=()):
+        for rescan in (False, True):
+            index = self.enumerate(rescan)
+            with NS_SiUSBXp.dev_lock:
+                for dev in index:
+                    if 'NeilScope' not in dev['desc'] or dev['serial'] in skip:
+                        continue
+                    if self.dev_serial is not None and dev['serial'] != self.dev_serial:
+                        continue
+                    if self.dev_num is not None and dev['index'] != self.dev_num:
+                        continue
+
+                    key = (dev['serial'], self.si_dll)
+                    if key in NS_SiUSBXp.dev_claimed:
+                        continue
+                    NS_SiUSBXp.dev_claimed.add(key)
+                    self.claimed = key
+                    return dev
+        return None
+
+    def unclaim(self):
+        with NS_SiUSBXp.dev_lock:
+            NS_SiUSBXp.dev_claimed.discard(self.claimed)
+            self.claimed = None
+
 
     # // ------------------------------------ NS_SiUSBXp ------------------------------------ //
 
@@ -93,6 +189,13 @@ class NS_SiUSBXp(object):
 
     #SI_GetProductString (DWORD DeviceNum, LPVOID DeviceString, DWORD Options)
     def get_vidpid(self, dev_id, vp = [0, 0]):
+        # get from devices index if enumerated
+        index = NS_SiUSBXp.dev_index.get(self._si_dll, [])
+        if dev_id < len(index):
+            vp[:] = [index[dev_id]['vid'], index[dev_id]['pid']]
+            self.si_code = 0x00
+            return self.si_code
+
         s = [ create_string_buffer(32), create_string_buffer(32) ]
         self.si_code = self.si_dll.SI_GetProductString(dev_id, s[0], 0x03)
         self.si_code = self.si_dll.SI_GetProductString(dev_id, s[1], 0x04)
@@ -104,6 +207,7 @@ class NS_SiUSBXp(object):
     # SI_Open (DWORD DeviceNum, HANDLE Handle)
     def open(self, dn):
         self.si_code = self.si_dll.SI_Open(DWORD(dn), byref(self.handle))
+        self.open_dev = dn
         self.log('open dev %d' % dn)
         return self.si_code
 
@@ -111,6 +215,7 @@ class NS_SiUSBXp(object):
     # SI_Close (HANDLE Handle)
     def close(self):
         self.si_code = self.si_dll.SI_Close(self.handle)
+        self.unclaim()
         self.log('close dev: ')
         return self.si_code
 
@@ -119,42 +224,122 @@ class NS_SiUSBXp(object):
     def flush_bufers(self, hard):
         self.si_code = self.si_dll.SI_FlushBuffers(self.handle, c_ubyte(0x01), c_ubyte(0x01))
         if hard:
-            qb = c_ulong()
-            qsts = c_ubyte()
-            buf = c_ubyte()
-            rb = c_ulong()
-            while not self.si_code:
-                self.si_code = self.si_dll.SI_CheckRXQueue(self.handle, byref(qb), byref(qsts))
-                if not self.si_code and qsts:
-                    self.si_code = self.si_dll.SI_Read(self.handle, byref(buf), c_ulong(1), byref(rb), None)
-                    if not self.si_code:
-                        break
-                else:
-                    break
+            self.drain()
         return self.si_code
 
 
+    # SI_STATUS SI_CheckRXQueue (HANDLE Handle, LPDWORD NumBytesInQueue, LPDWORD QueueStatus)
+    # read all bytes reported by rx queue with one SI_Read, repeat until queue empty
+    def drain(self):
+        qb = c_ulong()
+        qsts = c_ulong()
+        rb = c_ulong()
+        drained = 0
+
+        while not self.si_code:
+            self.si_code = self.si_dll.SI_CheckRXQueue(self.handle, byref(qb), byref(qsts))
+            if self.si_code or not qb.value:
+                break
+
+            buf = self.rx_buffer(qb.value)
+            self.si_code = self.si_dll.SI_Read(self.handle, byref(buf), c_ulong(qb.value), byref(rb), None)
+            drained += rb.value
+
+        if drained:
+            self.log('drain %d bytes' % drained)
+        return drained
+
+
+    # get reusable ctypes buffer not less 'nb' bytes
+    def rx_buffer(self, nb):
+        if len(self.rx_buf) < nb:
+            self.rx_buf = (c_ubyte * nb)()
+        return self.rx_buf
+
+    def tx_buffer(self, nb):
+        if len(self.tx_buf) < nb:
+            self.tx_buf = (c_ubyte * nb)()
+        return self.tx_buf
+
+
     # SI_STATUS SI_Read (HANDLE Handle, LPVOID Buffer, DWORD NumBytesToRead, DWORD *NumBytesReturned, OVERLAPPED* 0 = NULL)
-    def read(self, rd_buf, nb):
-        buf = (c_ubyte * nb)()
+    # read to reusable buffer, return memoryview of readed bytes, valid until next read
+    def read_view(self, nb):
+        buf = self.rx_buffer(nb)
         rb = c_ulong()
 
         self.si_code = self.si_dll.SI_Read(self.handle, byref(buf), c_ulong(nb), byref(rb), None)
-        rd_buf[:] = [buf[j] for j in range(rb.value)]
+        self.rx_view = memoryview(buf).cast('B')[:rb.value]
+        return self.rx_view
+
+    def read(self, rd_buf, nb):
+        rd_buf[:] = self.read_view(nb)
 
-        self.log('read: [ %s ] ' % ', '.join(hex(e) for e in rd_buf)) #['0x%X' % b for b in rd_buf])
+        if self.lg is not None:
+            self.log('read: [ %s ] ' % ', '.join(hex(e) for e in rd_buf)) #['0x%X' % b for b in rd_buf])
         return self.si_code
 
 
+    # streaming read, poll rx queue and read available bytes in chunks to caller
+    # writable buffer, yield (received bytes, memoryview of new chunk) after each chunk
+    def read_stream(self, out_buf, nb, **kwargs):
+        max_chunk = kwargs.get('max_chunk', 65536)
+        poll = kwargs.get('poll', 0.0005)
+        timeout = kwargs.get('timeout', self.read_timeout) / 1000
+
+        out = memoryview(out_buf).cast('B')
+        qb = c_ulong()
+        qsts = c_ulong()
+        rb = c_ulong()
+        got = 0
+        # timeout counted from last received chunk
+        deadline = monotonic() + timeout
+
+        while got < nb:
+            self.si_code = self.si_dll.SI_CheckRXQueue(self.handle, byref(qb), byref(qsts))
+            if self.si_code:
+                break
+
+            n = min(qb.value, nb - got, max_chunk)
+            if not n:
+                if monotonic() > deadline:
+                    self.si_code = 0x0d
+                    break
+                sleep(poll)
+                continue
+
+            # read direct to caller buffer
+            dst = (c_ubyte * n).from_buffer(out_buf, got)
+            self.si_code = self.si_dll.SI_Read(self.handle, byref(dst), c_ulong(n), byref(rb), None)
+            del dst
+            if self.si_code and self.si_code != 0x0d:
+                break
+
+            got += rb.value
+            deadline = monotonic() + timeout
+            yield got, out[got - rb.value:got]
+
+        if self.lg is not None:
+            self.log('read stream: %d of %d bytes' % (got, nb))
+
+
     # SI_STATUS SI_Write (HANDLE Handle, LPVOID Buffer, DWORD NumBytesToWrite, DWORD *NumBytesWritten, OVERLAPPED* 0 = NULL)
     def write(self, in_buf, nb):
         wrd_nb = c_ulong()
-        buf = (c_ubyte * nb)()
 
-        for i in range(nb): buf[i] = c_ubyte(in_buf[i])
+        if isinstance(in_buf, bytearray) and len(in_buf) >= nb:
+            # writable python buffer - pass without copy
+            buf = (c_ubyte * nb).from_buffer(in_buf)
+        else:
+            if not isinstance(in_buf, bytes):
+                in_buf = bytes(in_buf[:nb])
+            buf = self.tx_buffer(nb)
+            memmove(buf, in_buf, nb)
+
         self.si_code = self.si_dll.SI_Write(self.handle, byref(buf), c_ulong(nb), byref(wrd_nb), 0)
 
-        self.log('write: [ %s ] ' %  ', '.join(hex(e) for e in buf)) # ['0x%X' % b for b in buf])
+        if self.lg is not None:
+            self.log('write: [ %s ] ' %  ', '.join(hex(e) for e in buf[:nb])) # ['0x%X' % b for b in buf])
         return self.si_code
 
 
@@ -167,6 +352,8 @@ class NS_SiUSBXp(object):
 
     # SI_SetTimeouts (DWORD ReadTimeout, DWORD WriteTimeout)
     def set_timeout(self, rt = 1000, wt = 1000):
+        self.read_timeout = rt
+        self.write_timeout = wt
         self.si_code = self.si_dll.SI_SetTimeouts(DWORD(rt), DWORD(wt))
         self.log('set timeout rt:%d wt:%d  ' % (rt, wt))
         return self.si_code
@@ -178,3 +365,4 @@ class NS_SiUSBXp(object):
         wt = DWORD()
         self.si_code = self.si_dll.SI_GetTimeouts(byref(rt), byref(wt))
         return (rt.value, wt.value)
+
@@ -0,0 +1,65 @@
+#!python3
+
+# GUI startup time measurement, each run in new python process:
+#   'cached' - compiled cached UI module, commander imported on first test
+#   'loadui' - '.ui' parsed at runtime, commander and transports imported at startup
+#
+# usage: python ns_startup.py [runs]
+#        QT_QPA_PLATFORM=offscreen python ns_startup.py  - without display
+
+import os
+import sys
+import json
+import subprocess
+from time import perf_counter
+
+
+child_code = r'''
+import os, sys, json
+from time import perf_counter
+start = perf_counter()
+if os.environ['NS_UI_CACHE'] == '0':
+    import ns_commander, ns_test, ns_transport
+    ns_transport.ns_transport_class('usbxpress')
+    ns_transport.ns_transport_class('telnet')
+imported = perf_counter()
+from PyQt5.QtWidgets import QApplication
+import main
+app = QApplication(sys.argv)
+ex = main.ns_utility()
+app.processEvents()
+shown = perf_counter()
+ex.CloseButtonClicked()
+print(json.dumps({'import': imported - start, 'window': shown - start}))
+'''
+
+
+def run_once(mode):
+    env = dict(os.environ)
+    env['NS_UI_CACHE'] = '1' if mode == 'cached' else '0'
+
+    start = perf_counter()
+    out = subprocess.check_output([sys.executable, '-c', child_code], env=env,
+                                  cwd=os.path.dirname(os.path.abspath(__file__)))
+    result = json.loads(out.decode().strip().splitlines()[-1])
+    result['process'] = perf_counter() - start
+    return result
+
+
+def main(runs):
+    # first run generate UI module cache, not counted
+    run_once('cached')
+
+    times = {}
+    for mode in ('loadui', 'cached'):
+        res = [run_once(mode) for j in range(runs)]
+        times[mode] = min(r['window'] for r in res), min(r['process'] for r in res)
+        print('%-7s window shown: %7.1f ms, process total: %7.1f ms (best of %d)' %
+              (mode, times[mode][0] * 1000, times[mode][1] * 1000, runs))
+
+    gain = times['loadui'][0] - times['cached'][0]
+    print('startup improvement: %.1f ms (%.0f%%)' % (gain * 1000, gain * 100 / times['loadui'][0]))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
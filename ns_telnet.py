@@ -1,8 +1,12 @@
 #!python3
 
 import datetime
+import socket
+from time import monotonic
+import threading
 import telnetlib
 from ns_interface import NS_DriverInterface
+from ns_ringbuf import NS_RingBuffer
 
 
 class NS_Telnet(NS_DriverInterface):
@@ -19,6 +23,15 @@ class NS_Telnet(NS_DriverInterface):
 
         self.readrequest_bytes = 1
         self.read_done = False
+        # received bytes over last read request
+        self.rx_rest = b''
+
+        # optional background reader thread, drains socket to ring buffer
+        self.reader = kwargs.get('reader', False)
+        self.reader_size = kwargs.get('reader_size', 1 << 16)
+        self.reader_thread = None
+        self.ring = None
+        self.rx_overflow = 0
 
         self.write_timeout = 1000
         self.read_timeout = 1000
@@ -66,30 +79,144 @@ class NS_Telnet(NS_DriverInterface):
         try:
             self.telnet.open(self.server_ip, self.server_port, 1)
             self._open = True
+            self.rx_rest = b''
             code = 0
         except Exception as ex:
             e = '>> ' + str(ex).replace(' ', '_').upper()
             code = 0x10
 
         self.log('try open - %s:%s' % ( self.server_ip, self.server_port), code=code)
+
+        if not code and self.reader:
+            self.start_reader()
         return code
 
     def close(self):
+        self.stop_reader()
         self.telnet.close()
         self.log('closed')
         return 0
 
     def flush_bufers(self, hard):
         """ """
+        if hard:
+            self.rx_rest = b''
+            if self.ring is not None:
+                self.ring.clear()
+        return 0
+
+    # // ------------------------------------ background reader ------------------------------------ //
+
+    def start_reader(self):
+        """ start thread continuously drains socket to ring buffer """
+        if self.reader_thread is not None:
+            return 0
+
+        self.ring = NS_RingBuffer(self.reader_size)
+        self.rx_overflow = 0
+        self.reader_thread = threading.Thread(target=self._reader_loop,
+                                              args=(self.telnet.get_socket(), self.ring))
+        self.reader_thread.daemon = True
+        self.reader_thread.start()
+        self.log('reader started, ring %d bytes' % self.reader_size)
         return 0
 
+    def stop_reader(self):
+        thread = self.reader_thread
+        if thread is None:
+            return 0
+
+        self.reader_thread = None
+        # wake up blocked recv
+        try:
+            self.telnet.get_socket().shutdown(socket.SHUT_RD)
+        except (OSError, AttributeError):
+            pass
+        thread.join()
+        self.ring = None
+        return 0
+
+    def _reader_loop(self, sock, ring):
+        chunk = bytearray(4096)
+        view = memoryview(chunk)
+        while self.reader_thread is not None:
+            try:
+                n = sock.recv_into(chunk)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            # connection closed
+            if not n:
+                break
+            ring.write(view[:n])
+        ring.close()
+
+    # number of received bytes dropped by ring buffer overflow
+    def overflow_count(self):
+        if self.ring is not None:
+            return self.ring.overflow
+        return self.rx_overflow
+
+    def read_ring(self, rd_buf, nb):
+        """ read from background reader ring buffer """
+        ans = self.ring.read(nb, self.read_timeout / 1000)
+
+        status = 0x00
+        if len(ans) < nb:
+            status = 0x0d
+
+        overflow = self.ring.overflow
+        if overflow != self.rx_overflow:
+            self.log('rx overflow, %d bytes dropped' % (overflow - self.rx_overflow), code=0x02)
+            self.rx_overflow = overflow
+
+        rd_buf[:] = ans
+        if self.lg is not None:
+            self.log( 'read - [%s]' % ', '.join( [hex(b) for b in rd_buf] ), code=status )
+        return status
+
+    def read_stream(self, out_buf, nb, **kwargs):
+        """ streaming read, yield (received bytes, memoryview of new chunk) """
+        timeout = kwargs.get('timeout', self.read_timeout) / 1000
+
+        out = memoryview(out_buf).cast('B')
+        got = 0
+        self.code = 0x00
+        # timeout counted from last received chunk
+        deadline = monotonic() + timeout
+
+        while got < nb:
+            if self.ring is not None:
+                a = self.ring.read_some(nb - got, max(0, deadline - monotonic()))
+            else:
+                a = self.rx_rest or self.telnet.read_eager_raw()
+                self.rx_rest = a[nb - got:]
+                a = a[:nb - got]
+
+            if not a:
+                if monotonic() > deadline:
+                    self.code = 0x0d
+                    break
+                continue
+
+            out[got:got + len(a)] = a
+            got += len(a)
+            deadline = monotonic() + timeout
+            yield got, out[got - len(a):got]
+
+        self.log('read stream: %d of %d bytes' % (got, nb))
+
     def read(self, rd_buf, nb):
 
+        if self.ring is not None:
+            return self.read_ring(rd_buf, nb)
+
         status = 0x00
         dt = datetime.datetime
         start = dt.now().time().second * 1000000 + dt.now().time().microsecond
 
-        ans = b''
+        ans = self.rx_rest
         while len(ans) < nb:
             a = self.telnet.read_eager_raw()
             # if a != b'':
@@ -101,7 +228,9 @@ class NS_Telnet(NS_DriverInterface):
                 self.log(str(ans))
                 break
 
-        rd_buf[:] = [b for b in ans]
+        # keep surplus bytes for next read, responds may be pipelined
+        self.rx_rest = ans[nb:]
+        rd_buf[:] = ans[:nb]
         self.log( 'read - [%s]' % ', '.join( [hex(b) for b in rd_buf] ) )
         return status
 
@@ -111,6 +240,27 @@ class NS_Telnet(NS_DriverInterface):
         self.telnet.write( bytearray(b for b in buf) )
         return 0
 
+    def write_frames(self, frames):
+        """ scatter-gather write of several frames with one send call """
+        # double IAC bytes same as telnetlib write
+        frames = [f.replace(telnetlib.IAC, telnetlib.IAC + telnetlib.IAC) for f in frames]
+        self.log('write %d frames - [%s]' % (len(frames), ', '.join(f.hex() for f in frames)))
+
+        sock = self.telnet.get_socket()
+        try:
+            total = sum(len(f) for f in frames)
+            if hasattr(sock, 'sendmsg'):
+                sent = sock.sendmsg(frames)
+            else:
+                sent = 0
+            # send rest if partial send or sendmsg not supported (win32)
+            if sent < total:
+                sock.sendall(b''.join(frames)[sent:])
+        except (OSError, AttributeError) as ex:
+            self.log('write frames fail - %s' % ex, code=0x04)
+            return 0x04
+        return 0
+
     def setbr(self, br=9600):
         self.log('set baudrate - %d' % br)
         return 0
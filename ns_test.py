@@ -0,0 +1,315 @@
+#!python3
+
+from time import sleep, perf_counter
+from ns_commander import ns_data_samples
+
+
+# empty log func, used if log func not defined
+def nlg(msg, lvl=''): pass
+
+
+# step result value for JSON output, NaN (can't be measured) -> None
+def ns_result_value(v):
+    v = float(v)
+    return None if v != v else v
+
+
+# neilscope device test sequence program, [ command function, [func args], delay sec after, log mesaage ],
+# delay is max wait time, device readiness polled while waiting,
+# 'get data' step may have 'limits': { measurement: (min, max), ... } checked by ns_measure
+# and 'measure': { ns_measure kwargs } with sample period and scale,
+# 'events': (min, max) - count of device trigger condition events found in capture
+def ns_test_sequence(ns3):
+    return [
+        {'cmd': ns3.mode, 'data': 'la', 'delay': 0, 'msg': 'set mode \'LA\'...'},
+        {'cmd': ns3.send_sw_ver, 'data': [1.1, 0x02], 'delay': 0.5, 'msg': 'send sw ver...'},
+        {'cmd': ns3.mode, 'data': 'osc', 'delay': 0, 'msg': 'set mode \'OSC\'...'},
+        {'cmd': ns3.send_sw_ver, 'data': [1.1, 0x02], 'delay': 0.5, 'msg': 'send sw ver...'},
+        {'cmd': ns3.ach_state, 'data': ['AB', 'dc'], 'delay': 0, 'msg': 'set ch A/B DC input...'},
+        {'cmd': ns3.ach_div, 'data': ['AB', '50V'], 'delay': 0.05, 'msg': 'set ch A/B 50V/div...'},
+        {'cmd': ns3.ach_div, 'data': ['AB', '50mV'], 'delay': 0.05, 'msg': 'set ch A/B 50mV/div...'},
+        {'cmd': ns3.sync_mode, 'data': ['off'], 'delay': 0, 'msg': 'set sync off state...'},
+        {'cmd': ns3.sync_sourse, 'data': ['A'], 'delay': 0, 'msg': 'set sync sourse to ch A...'},
+        {'cmd': ns3.sync_type, 'data': ['rise'], 'delay': 0, 'msg': 'set sync type \'rise\'...'},
+        {'cmd': ns3.sweep_div, 'data': ['1uS'], 'delay': 0, 'msg': 'set sweep 1uS/div...'},
+        {'cmd': ns3.sweep_mode, 'data': ['standart'], 'delay': 0, 'msg': 'set swep mode \'standart\'...'},
+        {'cmd': ns3.get_data, 'data': ['A', 100, []], 'delay': 0, 'msg': 'get ch A 100 bytes data...'},
+        {'cmd': ns3.get_data, 'data': ['B', 100, []], 'delay': 0, 'msg': 'get ch B 100 bytes data...'},
+    ]
+
+
+# device test: connect -> batt -> test sequence -> disconnect, without any GUI,
+# ns3 - NS3_Commander with interface already set
+class NS_TestRunner(object):
+    """ device test runner """
+
+    def __init__(self, ns3, **kwargs):
+        """ constructor """
+        self.ns3 = ns3
+        # log func must be of the form: ' def nlg(msg, lvl) '
+        self.lg = kwargs.get('log', None) or nlg
+        # progress func must be of the form: ' def progress(percent) '
+        self.progress = kwargs.get('progress', None) or (lambda p: None)
+        self.sequence = kwargs.get('sequence', None)
+        # cancel func must be of the form: ' def cancel() ', return True for stop test
+        self.cancel = kwargs.get('cancel', None) or (lambda: False)
+        # optional NS_CaptureArchive, all captures saved with run and step numbers
+        self.archive = kwargs.get('archive', None)
+        self.run_id = 0
+        # optional NS_GoldenLibrary, captures compared to reference of same settings,
+        # 'save_golden' - save captures as references instead of compare
+        self.golden = kwargs.get('golden', None)
+        self.save_golden = kwargs.get('save_golden', False)
+        # poll device readiness after command instead of fixed delay
+        self.poll = kwargs.get('poll', True)
+        self.poll_interval = kwargs.get('poll_interval', 0.01)
+        # send configuration steps without delay as one coalesced burst
+        self.coalesce = kwargs.get('coalesce', True)
+
+        self.result = {}
+        # captured samples bytes and sweep mode by channel from 'get data' steps
+        self.captures = {}
+        self.sweeps = {}
+
+    def log(self, msg, lvl='ginf'):
+        self.lg(msg, lvl)
+
+    # configuration steps burst from sequence index 'j': steps without delay and
+    # next step with delay, 'get data' and auto range steps are not in burst
+    def burst_len(self, sequence, j):
+        n = 0
+        for cn in sequence[j:]:
+            if cn['cmd'] in (self.ns3.get_data, self.ns3.ach_autorange):
+                break
+            n += 1
+            if cn['delay']:
+                break
+        return n if self.coalesce else min(n, 1)
+
+    # run test sequence, return True if all steps successful
+    def run_seq(self):
+        sequence = self.sequence or ns_test_sequence(self.ns3)
+        steps = self.result.setdefault('steps', [])
+
+        progr_one_step = 100 / len(sequence)
+        progr = 0
+
+        self.log('start test sequence')
+        j = 0
+        while j < len(sequence):
+            if self.cancel():
+                self.log('CANCELLED\r\n', 'err')
+                self.result['error'] = 'cancelled'
+                return False
+
+            burst = sequence[j:j + self.burst_len(sequence, j)]
+            if len(burst) > 1:
+                if not self.run_burst(burst, steps):
+                    return False
+                progr = progr + progr_one_step * len(burst)
+                self.progress(int(progr))
+                j += len(burst)
+                continue
+
+            cn = sequence[j]
+            j += 1
+            self.log(cn['msg'])
+            step = { 'msg': cn['msg'].rstrip('.'), 'passed': False }
+            steps.append(step)
+
+            # send sequense command
+            start = perf_counter()
+            cmd_result = cn['cmd']( cn['data'] )
+            step['cmd_time'] = perf_counter() - start
+
+            # result
+            if not cmd_result:
+                if cn['cmd'] == self.ns3.get_data:
+                    ch, num, rd = cn['data']
+                    self.captures[ch] = ns_data_samples(rd[0], num)
+                    self.sweeps[ch] = self.ns3.sweep
+                    if self.archive is not None:
+                        self.archive.append(self.captures[ch], device=self.ns3.device_name(), run=self.run_id,
+                                            step=len(steps) - 1, **self.ns3.capture_settings(ch))
+                    if 'limits' in cn and not self.check_limits(cn, step, ch):
+                        return False
+                    if self.golden is not None and not self.check_golden(cn, step, ch):
+                        return False
+                    if 'events' in cn and not self.check_events(cn, step, ch):
+                        return False
+                self.log('SUCCESS\r\n')
+                step['passed'] = True
+                step['wait_time'], step['polls'] = self.wait_ready(cn['delay'])
+                step['wait_max'] = cn['delay']
+                progr = progr + progr_one_step
+                self.progress(int(progr))
+            else:
+                self.log('FAILED\r\n', 'err')
+                return False
+        return True
+
+    # run configuration steps as one burst: commands queued, sent with one coalesced
+    # write and all acks read, burst time and result set to each step
+    def run_burst(self, burst, steps):
+        ns3 = self.ns3
+        first = len(steps)
+        start = perf_counter()
+
+        ns3.begin_cmds()
+        st = 0
+        for cn in burst:
+            self.log(cn['msg'])
+            steps.append({ 'msg': cn['msg'].rstrip('.'), 'passed': False, 'burst': len(burst) })
+            st = st or cn['cmd']( cn['data'] )
+        st = ns3.end_cmds() or st
+        cmd_time = perf_counter() - start
+
+        for step in steps[first:]:
+            step['cmd_time'] = cmd_time
+        if st:
+            self.log('FAILED\r\n', 'err')
+            return False
+
+        for step in steps[first:]:
+            step['passed'] = True
+        self.log('SUCCESS\r\n')
+        step['wait_time'], step['polls'] = self.wait_ready(burst[-1]['delay'])
+        step['wait_max'] = burst[-1]['delay']
+        return True
+
+    # measure captured channel samples and check step limits
+    def check_limits(self, cn, step, ch):
+        from ns_measure import ns_check_batch
+        passed, failed, res = ns_check_batch([self.captures[ch]], cn['limits'], **cn.get('measure', {}))
+
+        step['measure'] = { name: ns_result_value(v[0]) for name, v in res.items() }
+        if not passed[0]:
+            step['failed'] = failed[0]
+            self.log('out of limits: %s' % ', '.join(
+                '%s=%g' % (name, res[name][0]) for name in failed[0]), 'err')
+            self.log('FAILED\r\n', 'err')
+        return bool(passed[0])
+
+    # compare captured channel samples to golden reference of current settings,
+    # step 'golden' - ns_golden.ns_compare kwargs, no reference - step not failed
+    def check_golden(self, cn, step, ch):
+        key = self.ns3.config_key(ch, len(self.captures[ch]))
+        if self.save_golden:
+            self.golden.save(key, self.captures[ch])
+            self.log('reference saved')
+            return True
+
+        try:
+            res = self.golden.compare(key, [self.captures[ch]], **cn.get('golden', {}))
+        except ValueError as ex:
+            self.log('reference compare error: %s' % ex, 'err')
+            self.log('FAILED\r\n', 'err')
+            return False
+        if res is None:
+            self.log('no reference for %s' % (key,), 'warn')
+            return True
+
+        step['golden'] = { name: ns_result_value(v[0]) for name, v in res.items() if name != 'deviation' }
+        if not res['passed'][0]:
+            self.log('reference mismatch: out %d, max dev %g, ncc %.3f' %
+                     (res['out'][0], res['max_dev'][0], res['ncc'][0]), 'err')
+            self.log('FAILED\r\n', 'err')
+        return bool(res['passed'][0])
+
+    # count trigger events of current device trigger settings in captured samples
+    def check_events(self, cn, step, ch):
+        from ns_trigger import ns_trigger_find
+        events = ns_trigger_find(self.captures[ch], **self.ns3.trigger_settings())
+        step['events'] = len(events)
+
+        lo, hi = cn['events']
+        if (lo is not None and len(events) < lo) or (hi is not None and len(events) > hi):
+            self.log('trigger events count %d out of limits' % len(events), 'err')
+            self.log('FAILED\r\n', 'err')
+            return False
+        return True
+
+    # captured channel samples decoded for sweep mode, see ns_decode
+    def decoded(self, ch):
+        from ns_decode import ns_decode
+        return ns_decode(self.sweeps[ch], self.captures[ch])
+
+    # wait device ready after command, readiness probe polled with short interval
+    # until ack, 'ceiling' - max wait time, return (wait time, polls count)
+    def wait_ready(self, ceiling):
+        if not ceiling:
+            return 0, 0
+
+        if not self.poll:
+            sleep(ceiling)
+            return ceiling, 0
+
+        start = perf_counter()
+        polls = 0
+        while True:
+            # probe read limited by rest of wait, silent busy device not hold longer
+            polls += 1
+            if not self.ns3.ready(timeout=ceiling - (perf_counter() - start)):
+                break
+
+            elapsed = perf_counter() - start
+            if elapsed >= ceiling:
+                break
+            sleep(min(self.poll_interval, ceiling - elapsed))
+
+        return perf_counter() - start, polls
+
+    # run full device test, return True if test successful, details in 'result'
+    def run(self):
+        ns3 = self.ns3
+        lg = self.log
+        test_seq_flag = False
+        start = perf_counter()
+
+        self.result = { 'passed': False, 'steps': [] }
+        self.captures = {}
+        self.sweeps = {}
+        if self.archive is not None:
+            self.run_id = self.archive.new_run()
+            self.result['run'] = self.run_id
+        self.progress(0)   # complite progress = 0%
+
+        lg('connect to device...')
+        if not ns3.connect():
+            self.result['connect_time'] = perf_counter() - start
+            self.result['fw_ver'] = ns3.mcu_firm_ver
+            lg('successful connected to device, fw ver: %3.1F' % ns3.mcu_firm_ver)
+
+            lg('get batt charge...')
+            battv = [int(0)]
+            if not ns3.get_batt(battv):
+                self.result['batt'] = battv[0]
+                lg('batt charge: %d%s' % (battv[0], '%'))
+
+                # start test sequence
+                test_seq_flag = self.run_seq()
+            else:
+                lg('FAILED', 'err')
+
+            lg('disconnect from device...')
+            if not ns3.disconnect():
+                lg('disconnect success')
+            else:
+                test_seq_flag = False
+                lg('FAILED', 'err')
+        else:
+            self.result['error'] = 'connect'
+            lg('FAILED', 'err')
+
+        # complite progress = 100%
+        self.progress(100)
+
+        lg('\r\n///{0}///{0}///'.format('-' * 20), 'end')
+        if test_seq_flag:
+            lg('TEST SUCCESSFUL DONE', 'end')
+        else:
+            lg('TEST FAILED', 'err')
+
+        self.result['passed'] = test_seq_flag
+        self.result['total_time'] = perf_counter() - start
+        return test_seq_flag
@@ -0,0 +1,65 @@
+#!python3
+
+import sys
+import importlib
+from time import perf_counter
+
+
+# registered transports, backend module imported only on first use
+# name: { 'module': module name, 'class': class name, 'caps': capability flags }
+ns_transports = {}
+
+# default capability flags
+ns_default_caps = {
+    'max_frame': 64,        # max bytes for one write call, coalesced bursts split by it
+    'pipelining': False,    # several frames may be sent before acks read
+    'streaming': False,     # partial reads while transfer in progress
+    'network': False,       # network endpoint, sessions may be pooled
+}
+
+
+# register transport backend by name
+def ns_register_transport(name, module, cls, **caps):
+    c = dict(ns_default_caps)
+    c.update(caps)
+    ns_transports[name] = { 'module': module, 'class': cls, 'caps': c, 'type': None }
+
+
+# find registered transport name in interface string, for example 'telnet' in 'telnet:2323'
+def ns_transport_name(interface):
+    for name in ns_transports:
+        if name in interface:
+            return name
+    return None
+
+
+def ns_transport_caps(name):
+    return ns_transports[name]['caps']
+
+
+# get transport class, import backend module on first use
+def ns_transport_class(name):
+    tr = ns_transports[name]
+    if tr['type'] is None:
+        module = importlib.import_module(tr['module'])
+        tr['type'] = getattr(module, tr['class'])
+    return tr['type']
+
+
+ns_register_transport('usbxpress', 'ns_siusbxp', 'NS_SiUSBXp',
+                      max_frame=4096, pipelining=True, streaming=True)
+
+ns_register_transport('telnet', 'ns_telnet', 'NS_Telnet',
+                      max_frame=65536, pipelining=True, streaming=True, network=True)
+
+
+if __name__ == '__main__':
+
+    # measure import time of each transport backend
+    for name in ns_transports:
+        loaded = [m for m in sys.modules]
+        start = perf_counter()
+        ns_transport_class(name)
+        t = perf_counter() - start
+        new = len([m for m in sys.modules if m not in loaded])
+        print('%-10s %7.2f ms, %d new modules' % (name, t * 1000, new))
@@ -0,0 +1,104 @@
+#!python3
+
+import sys
+import numpy as np
+from time import perf_counter
+
+
+# start indexes of true runs of boolean mask, runs started at sample 0 not counted
+def ns_mask_starts(mask):
+    return np.flatnonzero(mask[1:] & ~mask[:-1]) + 1
+
+
+# edge events with hysteresis: rising - signal was below 'down' and reach 'up',
+# falling - signal was above 'up' and reach 'down', return indexes of reached samples
+def ns_trig_edges(y, up, down, rising=True):
+    if up == down:
+        if rising:
+            return np.flatnonzero((y[:-1] < up) & (y[1:] >= up)) + 1
+        return np.flatnonzero((y[:-1] > down) & (y[1:] <= down)) + 1
+
+    hi = y >= up
+    lo = y <= down
+    if not rising:
+        hi, lo = lo, hi
+
+    # event - start of 'hi' run if last run before it was 'lo' run,
+    # only runs boundaries processed, not every sample
+    starts = ns_mask_starts(hi)
+    # -1 in front - no run ended before, arrays never empty
+    hi_ends = np.concatenate(([-1], np.flatnonzero(hi[:-1] & ~hi[1:])))
+    lo_ends = np.concatenate(([-1], np.flatnonzero(lo[:-1] & ~lo[1:])))
+
+    last_lo = lo_ends[np.searchsorted(lo_ends, starts) - 1]
+    last_hi = hi_ends[np.searchsorted(hi_ends, starts) - 1]
+    return starts[last_lo > last_hi]
+
+
+# logic analyzer condition: all channels selected by 'cond' mask are high
+def ns_la_cond(x, cond):
+    return (x & cond) == cond
+
+
+# logic analyzer difference: any channel selected by 'diff' mask changed from previous sample
+def ns_la_diff(x, diff):
+    d = np.zeros(len(x), dtype=bool)
+    d[1:] = ((x[1:] ^ x[:-1]) & diff) != 0
+    return d
+
+
+# find all trigger events in capture, same condition types as device sync type
+# (see ns_commander.ns_sync_type), 'up'/'down' - trigger levels in ADC codes,
+# 'cond'/'diff' - LA masks, return array of event sample indexes
+def ns_trigger_find(samples, sync_type='rise', **kwargs):
+    up = kwargs.get('up', 0x80)
+    down = kwargs.get('down', up)
+    cond = kwargs.get('cond', 0xFF)
+    diff = kwargs.get('diff', 0xFF)
+
+    if isinstance(samples, (bytes, bytearray, memoryview)):
+        x = np.frombuffer(samples, dtype=np.uint8)
+    else:
+        x = np.asarray(samples)
+
+    if sync_type == 'rise':
+        return ns_trig_edges(x, up, down, True)
+    if sync_type == 'fall':
+        return ns_trig_edges(x, up, down, False)
+
+    if sync_type in ('in win', 'out win'):
+        lo, hi = min(up, down), max(up, down)
+        inside = (x >= lo) & (x <= hi)
+        return ns_mask_starts(inside if sync_type == 'in win' else ~inside)
+
+    if sync_type == 'la cond':
+        return ns_mask_starts(ns_la_cond(x, cond))
+    if sync_type == 'la diff':
+        return np.flatnonzero(ns_la_diff(x, diff))
+    if sync_type == 'la cond and diff':
+        return np.flatnonzero(ns_la_diff(x, diff) & ns_la_cond(x, cond))
+    if sync_type == 'la cond or diff':
+        m = ns_la_diff(x, diff)
+        m[ns_mask_starts(ns_la_cond(x, cond))] = True
+        return np.flatnonzero(m)
+
+    return np.empty(0, dtype=np.intp)
+
+
+if __name__ == '__main__':
+
+    # benchmark, usage: python ns_trigger.py [samples]
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000000
+
+    t = np.arange(n)
+    y = (128 + 100 * np.sin(2 * np.pi * t / 1000.0) + np.random.normal(0, 3, n)).clip(0, 255).astype(np.uint8)
+    la = np.random.randint(0, 256, n).astype(np.uint8)
+
+    for sync_type, x, kw in (('rise', y, {'up': 128}), ('rise', y, {'up': 140, 'down': 116}),
+                             ('fall', y, {'up': 140, 'down': 116}), ('in win', y, {'up': 200, 'down': 180}),
+                             ('out win', y, {'up': 200, 'down': 50}), ('la cond', la, {'cond': 0x81}),
+                             ('la diff', la, {'diff': 0x01}), ('la cond or diff', la, {'cond': 0x81, 'diff': 0x01})):
+        start = perf_counter()
+        ev = ns_trigger_find(x, sync_type, **kw)
+        print('%-16s %-26s %d samples: %7.2f ms, %d events' %
+              (sync_type, kw, n, (perf_counter() - start) * 1000, len(ev)))
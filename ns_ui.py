@@ -0,0 +1,57 @@
+#!python3
+
+import os
+import hashlib
+import importlib.util
+
+
+# '.ui' file compiled to python module once and cached, module regenerated
+# when source '.ui' file changed, source hash saved in first line of module
+def ns_ui_module(ui_path, cache_dir='__pycache__'):
+    with open(ui_path, 'rb') as f:
+        digest = hashlib.sha1(f.read()).hexdigest()
+
+    name = os.path.splitext(os.path.basename(ui_path))[0] + '_ui'
+    path = os.path.join(os.path.dirname(ui_path), cache_dir, name + '.py')
+    tag = '# ui source sha1: %s\n' % digest
+
+    fresh = False
+    if os.path.isfile(path):
+        with open(path, 'rt') as f:
+            fresh = f.readline() == tag
+
+    if not fresh:
+        from PyQt5 import uic
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + '.tmp'
+        with open(ui_path, 'rt') as src, open(tmp, 'wt') as out:
+            out.write(tag)
+            uic.compileUi(src, out)
+        os.replace(tmp, path)
+
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# setup widgets from '.ui' file to 'window', same as ' uic.loadUi(ui_path, window) ',
+# 'cache' False or not writable cache folder - '.ui' file parsed at runtime
+def ns_load_ui(ui_path, window, cache=True):
+    if cache:
+        try:
+            module = ns_ui_module(ui_path)
+        except OSError:
+            module = None
+
+        if module is not None:
+            ui_class = [getattr(module, n) for n in dir(module) if n.startswith('Ui_')][0]
+            ui = ui_class()
+            ui.setupUi(window)
+            # widgets accessible as window attributes, like loadUi() does
+            window.__dict__.update(vars(ui))
+            return window
+
+    from PyQt5 import uic
+    return uic.loadUi(ui_path, window)
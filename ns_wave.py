@@ -0,0 +1,107 @@
+#!python3
+from PyQt5 import QtGui
+from PyQt5.QtCore import Qt, QPointF
+from PyQt5.QtWidgets import QGraphicsScene, QGraphicsView
+
+
+# waveform view, draws only min/max envelope decimated to view width,
+# mouse wheel - zoom, mouse drag - pan
+class NS_WaveView(QGraphicsView):
+    def __init__(self, parent=None):
+        super(NS_WaveView, self).__init__(parent)
+
+        self.setScene(QGraphicsScene(self))
+        self.setFrameStyle(0)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setAlignment(Qt.AlignLeft | Qt.AlignTop)
+        self.setBackgroundBrush(QtGui.QColor.fromRgb(0, 32, 49))
+
+        pen = QtGui.QPen(QtGui.QColor.fromRgb(170, 255, 0))
+        pen.setCosmetic(True)
+        self.path_item = self.scene().addPath(QtGui.QPainterPath(), pen)
+
+        self.pyramid = None
+        self.start = 0
+        self.stop = 0
+        # full scale of 8 bit adc samples
+        self.full_scale = 255
+        self.drag_x = None
+
+    # set new capture samples, uint8 array or bytes
+    def set_data(self, samples):
+        import numpy as np
+        from ns_decimate import NS_DecimationPyramid
+
+        if isinstance(samples, (bytes, bytearray)):
+            samples = np.frombuffer(samples, dtype=np.uint8)
+
+        self.pyramid = NS_DecimationPyramid(samples)
+        self.start = 0
+        self.stop = len(samples)
+        self.redraw()
+
+    def redraw(self):
+        import numpy as np
+
+        w = self.viewport().width()
+        h = self.viewport().height()
+        self.scene().setSceneRect(0, 0, w, h)
+
+        path = QtGui.QPainterPath()
+        if self.pyramid is not None and self.stop > self.start and w > 0:
+            x, mins, maxs = self.pyramid.envelope(self.start, self.stop, w)
+
+            # column x position and min/max y position in pixels
+            px = (x - self.start) * (w - 1) / max(1, self.stop - self.start - 1)
+            scale = (h - 1) / self.full_scale
+            ymin = (h - 1) - mins * scale
+            ymax = (h - 1) - maxs * scale
+
+            # zigzag polyline over column max/min points
+            xs = px.repeat(2).tolist()
+            ys = np.column_stack((ymax, ymin)).ravel().tolist()
+            poly = QtGui.QPolygonF([QPointF(a, b) for a, b in zip(xs, ys)])
+            path.addPolygon(poly)
+
+        self.path_item.setPath(path)
+
+    def resizeEvent(self, event):
+        super(NS_WaveView, self).resizeEvent(event)
+        self.redraw()
+
+    def wheelEvent(self, event):
+        if self.pyramid is None:
+            return
+
+        span = self.stop - self.start
+        # zoom around cursor position
+        center = self.start + span * event.pos().x() / max(1, self.viewport().width())
+        if event.angleDelta().y() > 0:
+            span = max(16, int(span * 0.8))
+        else:
+            span = min(len(self.pyramid), int(span * 1.25) + 1)
+
+        self.start = int(center - span * event.pos().x() / max(1, self.viewport().width()))
+        self.pan_to(self.start, span)
+
+    def mousePressEvent(self, event):
+        self.drag_x = event.pos().x()
+
+    def mouseMoveEvent(self, event):
+        if self.drag_x is None or self.pyramid is None:
+            return
+
+        span = self.stop - self.start
+        dx = event.pos().x() - self.drag_x
+        self.drag_x = event.pos().x()
+        self.pan_to(self.start - int(dx * span / max(1, self.viewport().width())), span)
+
+    def mouseReleaseEvent(self, event):
+        self.drag_x = None
+
+    def pan_to(self, start, span):
+        n = len(self.pyramid)
+        self.start = min(max(0, start), n - span)
+        self.stop = self.start + span
+        self.redraw()
@@ -0,0 +1,86 @@
+import os
+
+import numpy as np
+
+from ns_archive import NS_CaptureArchive
+
+
+def samples(j, n=100):
+    return (np.arange(n) * (j + 1)).astype(np.uint8)
+
+
+def test_append_read(tmp_path):
+    arch = NS_CaptureArchive(str(tmp_path))
+    for j in range(4):
+        n = arch.append(samples(j), device='dev', run=1, step=j, channel=j & 1, timestamp=10.0 + j)
+        assert n == j
+        # read right after append, data not yet flushed by close
+        assert np.array_equal(arch.read(n), samples(j))
+
+    idx = arch.index()
+    assert list(idx['step']) == [0, 1, 2, 3]
+    assert list(idx['time']) == [10.0, 11.0, 12.0, 13.0]
+    assert arch.new_run() == 2
+    arch.close()
+
+
+def test_chunk_rollover(tmp_path):
+    arch = NS_CaptureArchive(str(tmp_path), chunk_bytes=250)
+    for j in range(5):
+        arch.append(samples(j), run=1, step=j)
+        assert np.array_equal(arch.read(j), samples(j))
+
+    # one capture with header per chunk
+    assert list(arch.index()['chunk']) == [0, 1, 2, 3, 4]
+    assert len([p for p in os.listdir(str(tmp_path)) if p.endswith('.dat')]) == 5
+    for j in range(5):
+        assert np.array_equal(arch.read(j), samples(j))
+    arch.close()
+
+
+def test_find(tmp_path):
+    arch = NS_CaptureArchive(str(tmp_path))
+    for j in range(12):
+        arch.append(samples(j, 10), device='a' if j < 6 else 'b', run=1 + j // 4, step=j % 3, channel=j & 1)
+
+    assert list(arch.find(device='a')) == [0, 1, 2, 3, 4, 5]
+    assert list(arch.find(device='b', step=0)) == [6, 9]
+    assert list(arch.find(run=2, channel=1)) == [5, 7]
+    assert list(arch.find(device='c')) == []
+    assert len(arch.find()) == 12
+    arch.close()
+
+
+def test_rebuild_index(tmp_path):
+    arch = NS_CaptureArchive(str(tmp_path), chunk_bytes=250)
+    for j in range(5):
+        arch.append(samples(j), device='dev', run=3, step=j, channel=1, timestamp=float(j))
+    before = np.array(arch.index())
+    arch.close()
+
+    os.remove(os.path.join(str(tmp_path), 'captures.idx'))
+    arch = NS_CaptureArchive(str(tmp_path))
+    assert len(arch.index()) == 0
+    assert arch.rebuild_index() == 5
+    assert np.array_equal(np.array(arch.index()), before)
+    for j in range(5):
+        assert np.array_equal(arch.read(j), samples(j))
+    arch.close()
+
+
+def test_reopen(tmp_path):
+    arch = NS_CaptureArchive(str(tmp_path), chunk_bytes=250)
+    for j in range(3):
+        arch.append(samples(j), run=1, step=j)
+    arch.close()
+
+    # append continued in last chunk file
+    arch = NS_CaptureArchive(str(tmp_path), chunk_bytes=250)
+    assert arch.chunk == 2
+    assert arch.new_run() == 2
+    n = arch.append(samples(3), run=2)
+    assert n == 3
+    assert arch.index()['chunk'][n] == 3
+    for j in range(4):
+        assert np.array_equal(arch.read(j), samples(j))
+    arch.close()
@@ -0,0 +1,155 @@
+import threading
+from time import sleep
+
+from ns_interface import NS_WriteCoalescer
+from ns_sifake import NS_FakeSiDll
+from ns_commander import NS3_Commander
+from ns_test import NS_TestRunner
+
+
+def test_coalescer_split_and_status():
+    sent = []
+
+    def send(frames):
+        sent.append(frames)
+        return 0x04
+
+    tx = NS_WriteCoalescer(send, max_bytes=8, max_age=0)
+    threads = threading.active_count()
+    assert tx.put(b'1234') == 0
+    assert tx.put(b'5678') == 0
+    # not fit to max bytes - queued frames sent first, send error returned to caller
+    assert tx.put(b'9') == 0x04
+    assert sent == [[b'1234', b'5678']]
+    assert tx.send() == 0x04
+    assert sent[-1] == [b'9']
+    assert tx.send() == 0
+    assert threading.active_count() == threads
+
+
+def run_test(coalesce):
+    dll = NS_FakeSiDll()
+    ns3 = NS3_Commander()
+    ns3.set_interface(interface='usbxpress', si_dll=dll)
+    ns3.set_log(None)
+    runner = NS_TestRunner(ns3, coalesce=coalesce, poll=False)
+    return runner.run(), runner.result, dll.calls['SI_Write']
+
+
+def test_runner_config_burst():
+    ok, result, writes = run_test(True)
+    assert ok and all(s['passed'] for s in result['steps'])
+    assert any(s.get('burst', 0) > 1 for s in result['steps'])
+
+    ok, result, single = run_test(False)
+    assert ok
+    assert writes < single
+
+
+def test_burst_split_by_max_frame():
+    from ns_commander import ns_cmd
+
+    dll = NS_FakeSiDll()
+    ns3 = NS3_Commander()
+    ns3.set_interface(interface='usbxpress', si_dll=dll)
+    ns3.set_log(None)
+    assert ns3.ns_interface.frame_queue().max_bytes == ns3.caps['max_frame']
+    assert not ns3.connect()
+
+    cmds = [ns_cmd['sync mode'], ns_cmd['sync sourse'], ns_cmd['sync type'], ns_cmd['sweep div']]
+    writes = dll.calls['SI_Write']
+    assert not ns3.write_cmds(cmds)
+    assert dll.calls['SI_Write'] - writes == 1
+
+    # 5 bytes frames, two frames per write
+    ns3.ns_interface.set_max_frame(10)
+    writes = dll.calls['SI_Write']
+    assert not ns3.write_cmds(cmds)
+    assert dll.calls['SI_Write'] - writes == 2
+
+
+def test_coalescer_max_age():
+    sent = []
+
+    def send(frames):
+        sent.append(frames)
+        return 0
+
+    tx = NS_WriteCoalescer(send, max_bytes=100, max_age=0.01)
+    tx.put(b'1')
+    sleep(0.02)
+    # not sent by time, only by next put
+    assert sent == []
+    assert tx.put(b'2') == 0
+    assert sent == [[b'1']]
+    assert tx.pending() == 1
+
+
+# fake dll with failed writes
+class FailDll(NS_FakeSiDll):
+    fail = False
+
+    def SI_Write(self, handle, buf, nb, wb, overlapped):
+        if self.fail:
+            self.call('SI_Write')
+            return 0x04
+        return NS_FakeSiDll.SI_Write(self, handle, buf, nb, wb, overlapped)
+
+
+# fake dll answering 'sweep div' with bad crc
+class NackDll(NS_FakeSiDll):
+
+    def SI_Write(self, handle, buf, nb, wb, overlapped):
+        st = NS_FakeSiDll.SI_Write(self, handle, buf, nb, wb, overlapped)
+        if bytes([0x5B, 0x25]) in bytes(buf._obj)[:nb.value]:
+            self.rx[-1] ^= 0xFF
+        return st
+
+
+def connected(dll):
+    ns3 = NS3_Commander()
+    ns3.set_interface(interface='usbxpress', si_dll=dll)
+    ns3.set_log(None)
+    assert not ns3.connect()
+    return ns3
+
+
+def test_write_cmds_enqueue_error():
+    from ns_commander import ns_cmd
+
+    dll = FailDll()
+    ns3 = connected(dll)
+    # 5 bytes frames, second frame not fit - first sent by enqueue
+    ns3.ns_interface.set_max_frame(8)
+    dll.fail = True
+    writes = dll.calls['SI_Write']
+    assert ns3.write_cmds([ns_cmd['sync mode'], ns_cmd['sync sourse'], ns_cmd['sync type']])
+    # stopped at first error, rest frames not sent and not left queued
+    assert dll.calls['SI_Write'] - writes == 1
+    assert ns3.ns_interface.frame_queue().pending() == 0
+
+
+def test_burst_settings_after_ack():
+    ns3 = connected(NS_FakeSiDll())
+    ns3.begin_cmds()
+    assert not ns3.sync_mode(['auto'])
+    assert not ns3.sweep_div(['1uS'])
+    # not recorded before burst acked
+    assert ns3.sync['mode'] is None and ns3.sweep_time is None
+    assert not ns3.end_cmds()
+    assert ns3.sync['mode'] == 'auto' and ns3.sweep_time == '1uS'
+
+    ns3 = connected(NackDll())
+    ns3.begin_cmds()
+    assert not ns3.sync_mode(['auto'])
+    assert not ns3.ach_div(['AB', '1V'])
+    assert not ns3.sweep_div(['1uS'])
+    assert ns3.end_cmds()
+    assert ns3.sync['mode'] is None and ns3.sweep_time is None
+    assert ns3.adiv == { 'A': None, 'B': None }
+
+    # next burst not records settings of failed one
+    ns3.begin_cmds()
+    assert not ns3.sweep_mode(['standart'])
+    assert not ns3.end_cmds()
+    assert ns3.sync['mode'] is None
@@ -0,0 +1,53 @@
+from ns_sifake import NS_FakeSiDll, ns_fake_respond
+from ns_commander import NS3_Commander, ns_cmd, ns_data_samples
+
+
+# fake dll keeping all written command frames
+class RecordDll(NS_FakeSiDll):
+
+    def __init__(self, **kwargs):
+        NS_FakeSiDll.__init__(self, **kwargs)
+        self.frames = []
+
+    def SI_Write(self, handle, buf, nb, wb, overlapped):
+        data = bytes(buf._obj)[:nb.value]
+        j = 0
+        while j + 2 < len(data):
+            end = j + 4 + data[j + 2]
+            self.frames.append(data[j:end])
+            j = end
+        return NS_FakeSiDll.SI_Write(self, handle, buf, nb, wb, overlapped)
+
+
+def commander():
+    dll = RecordDll()
+    ns3 = NS3_Commander()
+    ns3.set_interface(interface='usbxpress', si_dll=dll)
+    ns3.set_log(None)
+    assert not ns3.connect()
+    dll.frames = []
+    return ns3, dll
+
+
+def test_sync_mode_command():
+    ns3, dll = commander()
+    adiv = list(ns_cmd['analog div'])
+
+    assert not ns3.sync_mode(['auto'])
+    assert [(f[1], f[3]) for f in dll.frames] == [(0x14, 0x02)]
+    # channels dividers command not changed
+    assert ns_cmd['analog div'] == adiv
+
+
+def test_respond_start_crc_strip():
+    ns3, dll = commander()
+    num = 300
+    out = []
+    assert not ns3.get_data(['A', num, out])
+
+    # data bytes cover all values, so some equal 'start' and 'crc' bytes,
+    # only first and last respond bytes removed
+    rs = ns_fake_respond(dll.frames[-1])
+    assert rs[-1] in rs[2:-1] and 0x5B in rs[2:-1]
+    assert out[0] == rs[1:-1]
+    assert ns_data_samples(out[0], num) == bytes(rs[-1 - num:-1])
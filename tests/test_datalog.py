@@ -0,0 +1,40 @@
+import os
+
+from ns_datalog import NS_SegmentWriter, NS_DataLogger, ns_read_segment
+
+
+def test_live_segment_read(tmp_path):
+    wr = NS_SegmentWriter(str(tmp_path), segment_bytes=1 << 20)
+    wr.write(1.0, 1, b'\x01\x02\x03')
+    wr.write(2.0, 2, b'\x04' * 10)
+
+    # not closed segment - preallocated tail not read as frames
+    assert os.path.getsize(wr.names[0]) == 1 << 20
+    frames = [(t, ch, bytes(s)) for t, ch, s in ns_read_segment(wr.names[0])]
+    assert frames == [(1.0, 1, b'\x01\x02\x03'), (2.0, 2, b'\x04' * 10)]
+
+    wr.close()
+    assert len(list(ns_read_segment(wr.names[0]))) == 2
+    assert os.path.getsize(wr.names[0]) < 100
+
+
+def test_stop_before_start(tmp_path):
+    logger = NS_DataLogger(None, NS_SegmentWriter(str(tmp_path)))
+    logger.stop()
+
+
+def test_frame_bigger_than_segment(tmp_path):
+    import pytest
+
+    wr = NS_SegmentWriter(str(tmp_path), segment_bytes=1024)
+    wr.write(1.0, 0, bytes(100))
+    for j in range(5):
+        with pytest.raises(ValueError):
+            wr.write(2.0, 0, bytes(2000))
+    wr.write(3.0, 0, bytes(100))
+    wr.close()
+
+    # oversized frames rejected without segment rotation
+    assert wr.segments == 1
+    assert len(os.listdir(str(tmp_path))) == 1
+    assert [t for t, ch, s in ns_read_segment(wr.names[0])] == [1.0, 3.0]
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from ns_decimate import NS_DecimationPyramid, ns_lttb, ns_minmax
+
+
+@pytest.fixture
+def y():
+    return np.random.RandomState(3).randint(0, 256, 10000).astype(np.uint8)
+
+
+def ref_minmax(y, x):
+    edges = list(x) + [None]
+    return ([y[a:b].min() for a, b in zip(edges, edges[1:])],
+            [y[a:b].max() for a, b in zip(edges, edges[1:])])
+
+
+def test_minmax(y):
+    for columns in (1, 7, 100, 9999, 20000):
+        mins, maxs = ns_minmax(y, columns)
+        cols = min(columns, len(y))
+        x = np.linspace(0, len(y), cols + 1)[:-1].astype(np.intp)
+        assert len(mins) == cols
+        assert (list(mins), list(maxs)) == ref_minmax(y, x)
+
+
+def test_minmax_empty():
+    mins, maxs = ns_minmax(np.empty(0, np.uint8), 100)
+    assert len(mins) == 0 and len(maxs) == 0
+
+
+def test_lttb(y):
+    ix = ns_lttb(y, 100)
+    assert len(ix) == 100
+    assert ix[0] == 0 and ix[-1] == len(y) - 1
+    assert np.all(np.diff(ix) > 0)
+    assert list(ns_lttb(y[:50], 100)) == list(range(50))
+    # spike kept
+    s = np.zeros(1000)
+    s[500] = 100
+    assert 500 in ns_lttb(s, 20)
+
+
+def test_envelope(y):
+    pyr = NS_DecimationPyramid(y, factor=4, min_len=256)
+    assert [lv[0] for lv in pyr.levels] == [4, 16]
+
+    for start, stop, columns in ((0, 10000, 100), (1234, 8765, 37), (3, 40, 100), (9990, 12000, 5), (-5, 17, 4)):
+        x, mins, maxs = pyr.envelope(start, stop, columns)
+        a, b = max(start, 0), min(stop, len(y))
+        assert x[0] == a
+        # columns cover window, coarse level blocks may extend to block edges
+        assert mins.min() <= y[a:b].min() and maxs.max() >= y[a:b].max()
+        assert len(mins) <= columns
+
+    # full window at level block - exact same as direct min/max
+    x, mins, maxs = pyr.envelope(0, 10000, 100)
+    assert (list(mins), list(maxs)) == ref_minmax(y, x)
+
+    # few samples - level 0, exact
+    x, mins, maxs = pyr.envelope(100, 130, 30)
+    assert list(mins) == list(y[100:130]) and list(x) == list(range(100, 130))
+
+
+def test_envelope_empty(y):
+    pyr = NS_DecimationPyramid(y)
+    for start, stop in ((50, 50), (60, 40), (20000, 30000)):
+        x, mins, maxs = pyr.envelope(start, stop, 100)
+        assert len(x) == len(mins) == len(maxs) == 0
+    x, mins, maxs = NS_DecimationPyramid(np.empty(0, np.uint8)).envelope(0, 100, 10)
+    assert len(x) == 0
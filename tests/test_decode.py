@@ -0,0 +1,107 @@
+import numpy as np
+
+from ns_sifake import NS_FakeSiDll
+from ns_commander import NS3_Commander, ns_data_offset, ns_data_samples
+from ns_decode import ns_decode, ns_decoders
+from ns_rle import NS_RLEDecoder
+
+
+def rle_pairs(n, seed=5):
+    rs = np.random.RandomState(seed)
+    pairs = np.empty(2 * n, np.uint8)
+    # few states - many equal neighbours merged
+    pairs[0::2] = rs.randint(0, 3, n)
+    pairs[1::2] = rs.randint(0, 256, n)
+    return bytes(pairs)
+
+
+def full_expand(raw, run_offset=1):
+    a = np.frombuffer(raw, dtype=np.uint8)
+    a = a[:len(a) & ~1]
+    return np.repeat(a[0::2], a[1::2].astype(np.int64) + run_offset)
+
+
+def test_rle_chunked_feed():
+    raw = rle_pairs(5000)
+    full = full_expand(raw)
+
+    for chunk in (1, 3, 64, 1001, len(raw)):
+        dec = NS_RLEDecoder()
+        for j in range(0, len(raw), chunk):
+            dec.feed(raw[j:j + chunk])
+        assert len(dec) == len(full)
+        assert np.array_equal(dec.expand(), full)
+        # merged - no equal neighbour states
+        assert np.all(dec.values()[1:] != dec.values()[:-1])
+
+    dec = NS_RLEDecoder(merge=False, run_offset=0)
+    dec.feed(raw[:101])
+    assert dec.carry == raw[100:101]
+    assert len(dec.values()) == 50
+    assert np.array_equal(dec.expand(), full_expand(raw[:100], 0))
+
+
+def test_rle_expand_windows():
+    raw = rle_pairs(2000)
+    full = full_expand(raw)
+    dec = NS_RLEDecoder()
+    dec.feed(raw)
+
+    n = len(full)
+    for start, stop in ((0, 1), (0, n), (5, 6), (n // 2, n // 2 + 777), (n - 3, n + 100), (-10, 20)):
+        assert np.array_equal(dec.expand(start, stop), full[max(start, 0):stop])
+    assert len(dec.expand(100, 100)) == 0
+    assert len(dec.expand(n, n + 10)) == 0
+
+    parts = list(dec.windows(999, 10))
+    assert [a for a, w in parts] == list(range(10, n, 999))
+    assert np.array_equal(np.concatenate([w for a, w in parts]), full[10:])
+
+    ix = np.array([0, 1, 255, 256, n // 3, n - 1])
+    assert np.array_equal(dec.at(ix), full[ix])
+
+
+def test_decode_zero_copy():
+    raw = bytes(np.random.RandomState(1).randint(0, 256, 1001).astype(np.uint8))
+    base = np.frombuffer(raw, dtype=np.uint8)
+
+    for mode in ('standart', 'min max', 'interlive'):
+        d = ns_decode(mode, raw)
+        for v in d.values():
+            assert np.shares_memory(v, base)
+
+    d = ns_decode('min max', raw)
+    assert len(d['min']) == len(d['max']) == 500
+    assert np.array_equal(d['max'], base[1:1000:2])
+    d = ns_decode('interlive', raw)
+    assert np.array_equal(d['phase1'], base[1::2])
+
+    d = ns_decode('la RLE', raw)
+    assert np.array_equal(d['decoder'].expand(), full_expand(raw))
+    assert ns_decode('no such mode', raw) is None
+    assert set(ns_decoders) == {'standart', 'min max', 'interlive', 'la RLE'}
+
+
+def test_rle_on_chunk():
+    ns3 = NS3_Commander()
+    ns3.set_interface(interface='usbxpress', si_dll=NS_FakeSiDll())
+    ns3.set_log(None)
+    assert not ns3.connect()
+
+    num = 10000
+    out = []
+    dec = NS_RLEDecoder()
+    assert not ns3.get_data(['LA', num, out], on_chunk=dec.on_chunk(ns_data_offset, num))
+
+    samples = ns_data_samples(out[0], num)
+    assert len(dec) == len(full_expand(samples))
+    assert np.array_equal(dec.expand(), full_expand(samples))
+
+    # respond split in small chunks, 'start'/header and 'crc' bytes skipped
+    rs = bytes([0x5B]) + bytes(out[0]) + b'\x00'
+    dec = NS_RLEDecoder()
+    cb = dec.on_chunk(ns_data_offset, num)
+    for j in range(0, len(rs), 7):
+        chunk = memoryview(rs[j:j + 7])
+        cb(j + len(chunk), chunk)
+    assert np.array_equal(dec.expand(), full_expand(samples))
@@ -0,0 +1,39 @@
+import pytest
+
+from ns_discover import ns_discover, ns_hosts, ns_probe
+from ns_simulator import NS_TelnetSimulator
+
+
+@pytest.fixture
+def sims():
+    # two devices on loopback addresses with same port, second respond slower
+    fast = NS_TelnetSimulator('127.0.0.2', 0, fw_ver=31).start()
+    slow = NS_TelnetSimulator('127.0.0.3', fast.port, delay=0.02, fw_ver=32).start()
+    yield fast, slow
+    fast.stop()
+    slow.stop()
+
+
+def test_hosts():
+    assert ns_hosts('127.0.0.1-3') == ['127.0.0.1', '127.0.0.2', '127.0.0.3']
+    assert ns_hosts('10.0.0.0/30') == ['10.0.0.1', '10.0.0.2']
+    assert ns_hosts(['127.0.0.9', '127.0.0.1-2']) == ['127.0.0.9', '127.0.0.1', '127.0.0.2']
+
+
+def test_discover_ranked(sims):
+    fast, slow = sims
+    found = ns_discover('127.0.0.1-5', fast.port, timeout=0.5)
+
+    assert [(d['ip'], d['port']) for d in found] == [('127.0.0.2', fast.port), ('127.0.0.3', fast.port)]
+    assert [d['fw_ver'] for d in found] == [3.1, 3.2]
+    assert found[0]['rtt'] < found[1]['rtt']
+    # probe session closed by 'disconnect'
+    assert fast.cmds == [0x81, 0x00, 0xFC]
+
+
+def test_probe_timeout():
+    sim = NS_TelnetSimulator('127.0.0.2', 0, delay=0.3).start()
+    try:
+        assert ns_probe('127.0.0.2', sim.port, timeout=0.05) is None
+    finally:
+        sim.stop()
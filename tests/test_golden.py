@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from ns_golden import NS_GoldenLibrary, ns_align, ns_compare
+
+
+def wave(length, shift=0):
+    x = np.arange(length) + shift
+    return 128 + 80 * np.sin(2 * np.pi * x / 137.0) + 30 * np.sign(np.sin(2 * np.pi * x / 411.0))
+
+
+def test_align_normalized():
+    ref = wave(500)
+    y = np.stack([wave(500, s) for s in (-7, 0, 12)])
+    lag, ncc = ns_align(y, ref, 16)
+    assert list(lag) == [7, 0, -12]
+    assert np.all(ncc > 0.999)
+
+
+def test_flat_capture_no_ncc():
+    lag, ncc = ns_align(np.full((1, 100), 128.0), wave(100), 8)
+    assert np.isnan(ncc[0])
+
+
+def test_length_mismatch():
+    with pytest.raises(ValueError):
+        ns_compare([bytes(100)], np.zeros(200))
+
+
+def test_library_key_by_length(tmp_path):
+    lib = NS_GoldenLibrary(str(tmp_path))
+    ref = wave(300).astype(np.uint8)
+    lib.save(('A', 300), ref.tobytes())
+    assert lib.compare(('A', 400), [bytes(400)]) is None
+    assert lib.compare(('A', 300), [ref.tobytes()])['passed'][0]
@@ -0,0 +1,14 @@
+import json
+
+from ns_test import NS_TestRunner
+
+
+def test_not_measured_is_null():
+    runner = NS_TestRunner(None)
+    runner.captures['A'] = bytes([128] * 100)
+    step = {}
+    assert not runner.check_limits({ 'limits': { 'freq': (1.0, None), 'mean': (-1, 1) } }, step, 'A')
+    assert step['measure']['freq'] is None
+    assert step['measure']['mean'] == 0.0
+    assert step['failed'] == ['freq']
+    json.dumps(step, allow_nan=False)
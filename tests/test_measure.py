@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from ns_measure import ns_measure, ns_check_batch
+
+
+def square(length, period, duty, lo=0, hi=200):
+    x = np.arange(length)
+    return np.where((x % period) < period * duty, hi, lo)
+
+
+def sine(length, period, zero=128, amp=100):
+    x = np.arange(length)
+    return zero + amp * np.sin(2 * np.pi * x / period)
+
+
+def test_square():
+    y = square(1000, 40, 0.25)
+    res = ns_measure([y.astype(np.uint8).tobytes()], dt=1e-6, zero=100, scale=0.01)
+
+    assert res['mean'][0] == pytest.approx((50 - 100) * 0.01, abs=0.01)
+    assert res['rms'][0] == pytest.approx(1.0, abs=0.01)
+    assert res['min'][0] == pytest.approx(-1.0)
+    assert res['max'][0] == pytest.approx(1.0)
+    assert res['p2p'][0] == pytest.approx(2.0)
+    assert res['period'][0] == pytest.approx(40e-6, rel=1e-3)
+    assert res['freq'][0] == pytest.approx(25e3, rel=1e-3)
+    assert res['duty'][0] == pytest.approx(0.25, abs=0.01)
+    # one sample step, 10% -> 90% interpolated
+    assert res['rise'][0] == pytest.approx(0.8e-6, rel=1e-3)
+    assert res['fall'][0] == pytest.approx(0.8e-6, rel=1e-3)
+
+
+@pytest.mark.parametrize('dtype', [np.uint8, np.float64])
+def test_sine_2d_batch(dtype):
+    # whole periods in capture
+    periods = [50, 125]
+    y = np.stack([np.round(sine(2000, p)) for p in periods]).astype(dtype)
+    res = ns_measure(y)
+
+    assert res['mean'] == pytest.approx([0, 0], abs=0.3)
+    assert res['rms'] == pytest.approx([100 / np.sqrt(2)] * 2, rel=0.01)
+    assert res['min'] == pytest.approx([-100, -100], abs=1)
+    assert res['max'] == pytest.approx([100, 100], abs=1)
+    assert res['period'] == pytest.approx(periods, rel=1e-3)
+    # duty counted by samples, one sample of period resolution
+    assert res['duty'] == pytest.approx([0.5, 0.5], abs=0.025)
+    # 10% -> 90% of sine: 2 * asin(0.8) / (2 pi) of period
+    rise = 2 * np.arcsin(0.8) / (2 * np.pi) * np.array(periods)
+    assert res['rise'] == pytest.approx(rise, rel=0.03)
+    assert res['fall'] == pytest.approx(rise, rel=0.03)
+
+
+def test_2d_uint8_same_as_bytes():
+    y = np.stack([np.round(sine(1000, 50)), np.round(sine(1000, 80))]).astype(np.uint8)
+    a = ns_measure(y)
+    b = ns_measure([r.tobytes() for r in y])
+    for name in a:
+        assert a[name] == pytest.approx(b[name], nan_ok=True)
+
+
+def test_check_batch_limits():
+    y = np.stack([square(1000, 40, 0.25), square(1000, 40, 0.5)]).astype(np.uint8)
+    passed, failed, res = ns_check_batch(y, { 'duty': (0.4, 0.6), 'freq': (0.02, 0.03) })
+    assert list(passed) == [False, True]
+    assert failed == [['duty'], []]
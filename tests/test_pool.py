@@ -0,0 +1,104 @@
+from time import sleep, perf_counter
+
+import pytest
+
+from ns_pool import NS_ConnectionPool
+from ns_commander import NS3_Commander, ns_session_close, ns_frame, ns_cmd
+from ns_simulator import NS_TelnetSimulator
+
+
+class FakeSession(object):
+    def __init__(self, dead=False):
+        self.dead = dead
+        self.closed = False
+        self.written = []
+
+    def set_log(self, log):
+        pass
+
+    def flush_bufers(self, hard):
+        return 0
+
+    def write(self, buf, size):
+        if self.dead:
+            raise BrokenPipeError(32, 'Broken pipe')
+        self.written.append(list(buf[:size]))
+        return 0
+
+    def read(self, rd, size):
+        if self.dead:
+            raise EOFError('telnet connection closed')
+        return 1
+
+    def close(self):
+        self.closed = True
+        return 0
+
+
+def test_dropped_session_evicted():
+    ns3 = NS3_Commander()
+    ns3.set_log(None)
+    pool = NS_ConnectionPool()
+    dead = FakeSession(dead=True)
+    pool.release(('127.0.0.1', 2323), dead)
+
+    assert pool.acquire(('127.0.0.1', 2323), ns3.session_check) is None
+    assert dead.closed
+    assert pool.idle_count() == 0
+    pool.clear()
+
+
+def test_check_exception_evicted():
+    def check(interface):
+        raise OSError('connection reset')
+
+    pool = NS_ConnectionPool()
+    session = FakeSession()
+    pool.release('key', session)
+    assert pool.acquire('key', check) is None
+    assert session.closed
+
+
+def test_reaper_disconnects_idle():
+    pool = NS_ConnectionPool(idle_timeout=0.1, close=ns_session_close)
+    session = FakeSession()
+    pool.release('key', session)
+
+    for j in range(50):
+        if session.closed:
+            break
+        sleep(0.05)
+    assert session.closed
+    assert session.written == [ns_frame(ns_cmd['disconnect'])]
+    assert pool.idle_count() == 0
+    pool.clear()
+
+
+def telnet(sim, pool, reader):
+    ns3 = NS3_Commander()
+    ns3.set_interface(interface='telnet', ip=sim.ip, port=sim.port, pool=pool, reader=reader)
+    ns3.set_log(None)
+    return ns3
+
+
+@pytest.mark.parametrize('reader', [False, True])
+def test_telnet_reuse_and_dropped_session(reader):
+    sim = NS_TelnetSimulator('127.0.0.1', 0).start()
+    pool = NS_ConnectionPool()
+    for j in range(3):
+        ns3 = telnet(sim, pool, reader)
+        assert not ns3.connect()
+        assert not ns3.disconnect()
+    assert sim.connections == 1
+
+    # device power off - pooled session dead, evicted and new session opened
+    sim.drop()
+    ns3 = telnet(sim, pool, reader)
+    start = perf_counter()
+    assert not ns3.connect()
+    assert perf_counter() - start < 1.0
+    assert sim.connections == 2
+    ns3.disconnect()
+    pool.clear()
+    assert sim.cmds[-1] == 0xFC
+    sim.stop()
@@ -0,0 +1,76 @@
+from time import sleep, perf_counter
+
+from ns_sifake import NS_FakeSiDll
+from ns_commander import NS3_Commander
+from ns_test import NS_TestRunner
+
+
+# busy device not respond to 'batt' probe, read wait full read timeout
+class BusyDll(NS_FakeSiDll):
+    busy = False
+
+    def SI_Write(self, handle, buf, nb, wb, overlapped):
+        if self.busy and bytes(buf._obj)[1] == 0xA0:
+            wb._obj.value = nb.value
+            return 0x00
+        return NS_FakeSiDll.SI_Write(self, handle, buf, nb, wb, overlapped)
+
+    def SI_Read(self, handle, buf, nb, rb, overlapped):
+        if len(self.rx) < nb.value:
+            sleep(self.read_timeout / 1000)
+        return NS_FakeSiDll.SI_Read(self, handle, buf, nb, rb, overlapped)
+
+
+def test_wait_ready_ceiling():
+    dll = BusyDll()
+    ns3 = NS3_Commander()
+    ns3.set_interface(interface='usbxpress', si_dll=dll)
+    ns3.set_log(None)
+    assert not ns3.connect()
+    assert dll.read_timeout == 5000
+
+    dll.busy = True
+    runner = NS_TestRunner(ns3)
+    start = perf_counter()
+    runner.wait_ready(0.05)
+    assert perf_counter() - start < 0.5
+    # read timeout restored after probes
+    assert dll.read_timeout == 5000
+
+    dll.busy = False
+    wait, polls = runner.wait_ready(0.05)
+    assert polls == 1
+
+
+# device not ready after connect: silent to 'mcu fw ver' for some time, then answer
+class StartingDll(NS_FakeSiDll):
+    silent_until = 0.0
+
+    def SI_Write(self, handle, buf, nb, wb, overlapped):
+        if bytes(buf._obj)[1] == 0x00 and perf_counter() < self.silent_until:
+            wb._obj.value = nb.value
+            return 0x00
+        return NS_FakeSiDll.SI_Write(self, handle, buf, nb, wb, overlapped)
+
+    def SI_Read(self, handle, buf, nb, rb, overlapped):
+        if len(self.rx) < nb.value:
+            sleep(self.read_timeout / 1000)
+        return NS_FakeSiDll.SI_Read(self, handle, buf, nb, rb, overlapped)
+
+    def SI_Open(self, num, handle):
+        # start time counted from open
+        self.silent_until = perf_counter() + 0.2
+        return NS_FakeSiDll.SI_Open(self, num, handle)
+
+
+def test_connect_fw_ver_poll():
+    dll = StartingDll()
+    ns3 = NS3_Commander()
+    ns3.set_interface(interface='usbxpress', si_dll=dll)
+    ns3.set_log(None)
+
+    start = perf_counter()
+    assert not ns3.connect()
+    assert perf_counter() - start < 0.6
+    assert ns3.mcu_firm_ver == 3.1
+    assert dll.read_timeout == 5000
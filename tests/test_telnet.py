@@ -0,0 +1,60 @@
+import socket
+from time import sleep
+
+import pytest
+
+from ns_commander import NS3_Commander, ns_cmd, ns_frame
+from ns_ringbuf import NS_RingBuffer
+from ns_sifake import ns_fake_respond
+from ns_simulator import NS_TelnetSimulator
+from ns_test import NS_TestRunner
+
+
+@pytest.fixture
+def sim():
+    sim = NS_TelnetSimulator('127.0.0.1', 0).start()
+    yield sim
+    sim.stop()
+
+
+def commander(sim, **kwargs):
+    ns3 = NS3_Commander()
+    ns3.set_interface(interface='telnet', ip=sim.ip, port=sim.port, **kwargs)
+    ns3.set_log(None)
+    return ns3
+
+
+@pytest.mark.parametrize('reader', [False, True])
+def test_runner(sim, reader):
+    runner = NS_TestRunner(commander(sim, reader=reader), poll=True)
+    assert runner.run()
+    assert len(runner.captures['A']) == 100
+
+
+def test_ring_overflow():
+    ring = NS_RingBuffer(8)
+    ring.write(b'0123456789')
+    assert ring.overflow == 2
+    assert ring.read(8, 0) == b'23456789'
+    assert ring.read(1, 0.01) == b''
+
+
+def test_simulator_iac_split(sim):
+    # 'trig X' with two 0xFF data bytes, doubled on wire
+    frame = ns_frame(ns_cmd['trig X'][:2] + [0xFF, 0xFF, 0x00])
+    wire = bytes(frame).replace(b'\xff', b'\xff\xff')
+    rs = bytes(ns_fake_respond(frame))
+
+    c = socket.create_connection((sim.ip, sim.port), timeout=2)
+    try:
+        # split at each position, including inside doubled pairs
+        for j in range(1, len(wire)):
+            c.sendall(wire[:j])
+            sleep(0.02)
+            c.sendall(wire[j:])
+            got = b''
+            while len(got) < len(rs):
+                got += c.recv(len(rs) - len(got))
+            assert got == rs
+    finally:
+        c.close()
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from ns_trigger import ns_trigger_find
+
+
+# reference: sample by sample hysteresis state machine
+def ref_edges(y, up, down, rising):
+    ev = []
+    armed = False
+    for k, v in enumerate(y):
+        below = v <= down if rising else v >= up
+        above = v >= up if rising else v <= down
+        if below:
+            armed = True
+        elif above and armed:
+            if k > 0 and not (y[k - 1] >= up if rising else y[k - 1] <= down):
+                ev.append(k)
+            armed = False
+    return ev
+
+
+@pytest.mark.parametrize('samples, sync_type, expected', [
+    ([0, 200], 'rise', [1]),
+    ([0, 0, 200, 200], 'rise', [2]),
+    ([200, 0], 'fall', [1]),
+    ([200, 200], 'rise', []),
+    ([0, 0], 'fall', []),
+    ([128], 'rise', []),
+])
+def test_single_edge(samples, sync_type, expected):
+    ev = ns_trigger_find(np.array(samples, np.uint8), sync_type, up=140, down=116)
+    assert list(ev) == expected
+
+
+def test_hysteresis_fuzz():
+    rng = np.random.RandomState(1)
+    for case in range(3000):
+        y = rng.choice([0, 100, 128, 150, 255], rng.randint(1, 12)).astype(np.uint8)
+        for sync_type in ('rise', 'fall'):
+            ev = ns_trigger_find(y, sync_type, up=140, down=116)
+            assert list(ev) == ref_edges(y, 140, 116, sync_type == 'rise')
@@ -0,0 +1,138 @@
+from ns_sifake import NS_FakeSiDll
+from ns_siusbxp import NS_SiUSBXp
+from ns_commander import NS3_Commander, ns_cmd
+
+
+def commander(**kwargs):
+    dll = NS_FakeSiDll()
+    ns3 = NS3_Commander()
+    ns3.set_interface(interface='usbxpress', si_dll=dll, **kwargs)
+    ns3.set_log(None)
+    assert not ns3.connect()
+    return ns3, dll
+
+
+def test_hard_flush_bulk_drain():
+    itf = NS_SiUSBXp(si_dll=NS_FakeSiDll())
+    assert not itf.connect()
+    itf.si_dll.rx += bytes(1000)
+    reads = itf.si_dll.calls.get('SI_Read', 0)
+    itf.si_dll.SI_FlushBuffers = lambda handle, tx, rx: 0
+    assert itf.drain() == 1000
+    assert itf.si_dll.calls['SI_Read'] - reads == 1
+    assert not itf.si_dll.rx
+
+
+def test_lazy_flush_skipped_in_sync():
+    ns3, dll = commander(lazy_flush=True)
+    flushes = dll.calls['SI_FlushBuffers']
+    for j in range(5):
+        assert not ns3.write_cmd(ns_cmd['batt'])
+    assert dll.calls['SI_FlushBuffers'] == flushes
+
+    # stream out of sync after error - next command flushed
+    dll.rx += b'\x00\x01'
+    assert ns3.write_cmd(ns_cmd['batt'])
+    assert not ns3.write_cmd(ns_cmd['batt'])
+    assert dll.calls['SI_FlushBuffers'] == flushes + 1
+
+
+def test_flush_default():
+    ns3, dll = commander()
+    flushes = dll.calls['SI_FlushBuffers']
+    ns3.write_cmd(ns_cmd['batt'])
+    assert dll.calls['SI_FlushBuffers'] == flushes + 1
+
+
+def test_reused_buffers():
+    itf = NS_SiUSBXp(si_dll=NS_FakeSiDll())
+    assert not itf.connect()
+    frame = [0x5B, 0xA0, 0x01, 0xA0]
+    from crc8 import ns_crc_buf
+    frame.append(ns_crc_buf(frame))
+
+    for buf in (frame, bytes(frame), bytearray(frame)):
+        assert not itf.write(buf, len(buf))
+        rd = []
+        assert not itf.read(rd, 5)
+        assert rd[:3] == [0x5B, 0xE0, 0x01]
+
+    rx_buf = itf.rx_buf
+    itf.write(frame, len(frame))
+    itf.read([], 5)
+    # buffers grown on demand only, not allocated per call
+    assert itf.rx_buf is rx_buf
+
+
+def test_streaming_get_data():
+    from ns_commander import ns_data_offset, ns_data_samples
+
+    ns3, dll = commander()
+    assert ns3.caps['streaming']
+    chunks = []
+    rd = []
+    assert not ns3.get_data(['A', 1000, rd], on_chunk=lambda got, chunk: chunks.append(bytes(chunk)))
+
+    stream = b''.join(chunks)
+    assert len(stream) == 1000 + 9
+    # samples decoded from stream same as from whole respond
+    assert stream[ns_data_offset:ns_data_offset + 1000] == ns_data_samples(rd[0], 1000)
+    assert ns_data_samples(rd[0], 1000)[:2] == bytes([6 * 7, 7 * 7])
+
+
+def test_read_stream_chunks():
+    itf = NS_SiUSBXp(si_dll=NS_FakeSiDll())
+    assert not itf.connect()
+    itf.si_dll.rx += bytes(range(200))
+
+    out = bytearray(200)
+    progress = [got for got, chunk in itf.read_stream(out, 200, max_chunk=64)]
+    assert progress == [64, 128, 192, 200]
+    assert out == bytes(range(200))
+
+
+def two_devices():
+    return [{ 'serial': 'NS3-%04d' % j, 'desc': 'NeilScope3', 'link': '', 'vid': '10C4', 'pid': '8693' }
+            for j in (1, 2)]
+
+
+def test_parallel_claim_distinct():
+    import threading
+
+    dll = NS_FakeSiDll(devices=two_devices())
+    workers = [NS_SiUSBXp(si_dll=dll) for j in range(3)]
+    barrier = threading.Barrier(3)
+    status = {}
+
+    def work(itf):
+        barrier.wait()
+        status[id(itf)] = itf.connect()
+
+    threads = [threading.Thread(target=work, args=(w,)) for w in workers]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+
+    claimed = sorted(w.claimed[0] for w in workers if w.claimed)
+    assert claimed == ['NS3-0001', 'NS3-0002']
+    assert sorted(status.values()) == [0, 0, 0xFF]
+    for w in workers:
+        w.unclaim()
+
+
+def test_open_fail_next_device():
+    dll = NS_FakeSiDll(devices=two_devices())
+    open_dev = dll.SI_Open
+    dll.SI_Open = lambda num, handle: 0x08 if num.value == 0 else open_dev(num, handle)
+
+    itf = NS_SiUSBXp(si_dll=dll)
+    assert not itf.connect()
+    assert itf.claimed[0] == 'NS3-0002'
+    itf.unclaim()
+
+    # device selected by serial not opened - claim released
+    itf = NS_SiUSBXp(si_dll=dll, serial='NS3-0001')
+    assert itf.connect()
+    assert itf.claimed is None
+    assert not NS_SiUSBXp(si_dll=dll, serial='NS3-0002').connect()